@@ -0,0 +1,138 @@
+import queue
+import threading
+import time
+from collections import deque
+
+
+class PoolBusyError(Exception):
+    """Raised when the request queue is full"""
+
+
+class AgentPool:
+    """
+    Serves FinBot to many browser sessions.
+    
+    Each request checks out one of `size` agents for its whole turn, so
+    sessions never share an agent mid-answer. At most `max_queue` requests
+    wait for a free agent; beyond that new requests are rejected straight
+    away (PoolBusyError) instead of piling up with unbounded latency.
+    Conversation history is kept per session.
+    """
+    
+    def __init__(self, agent_factory, size: int = 4, max_queue: int = 16, wait_timeout: float = 30.0,
+                 history_turns: int = 6, session_ttl_seconds: float = 3600):
+        self.size = size
+        self.max_queue = max_queue
+        self.wait_timeout = wait_timeout
+        self.history_turns = history_turns
+        self.session_ttl_seconds = session_ttl_seconds
+        
+        self.agents = queue.Queue()
+        for _ in range(size):
+            self.agents.put(agent_factory())
+        
+        # Admission: agents in use plus requests allowed to wait for one
+        self.slots = threading.BoundedSemaphore(size + max_queue)
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.waiting = 0
+        self.in_flight = 0
+        self.wait_times = deque(maxlen=500)
+        self.stats = {"completed": 0, "rejected": 0, "timed_out": 0, "errors": 0}
+    
+    def history(self, session_id: str):
+        """Recent turns of one session, as {"role", "content"} dicts"""
+        with self.lock:
+            session = self.sessions.get(session_id)
+            return list(session["turns"]) if session else []
+    
+    def _remember(self, session_id: str, user_message: str, answer: str):
+        with self.lock:
+            session = self.sessions.setdefault(session_id, {"turns": deque(maxlen=self.history_turns * 2)})
+            session["turns"].extend([
+                {"role": "user", "content": user_message},
+                {"role": "assistant", "content": answer}
+            ])
+            session["last_used"] = time.time()
+            
+            # Forget idle sessions so memory stays bounded
+            cutoff = time.time() - self.session_ttl_seconds
+            for stale_id in [sid for sid, s in self.sessions.items() if s["last_used"] < cutoff]:
+                del self.sessions[stale_id]
+    
+    def _checkout(self):
+        """Reserve a queue slot and wait for a free agent"""
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.stats["rejected"] += 1
+            raise PoolBusyError("FinBot is busy right now. Please try again in a moment.")
+        
+        with self.lock:
+            self.waiting += 1
+        start = time.perf_counter()
+        try:
+            agent = self.agents.get(timeout=self.wait_timeout)
+        except queue.Empty:
+            self.slots.release()
+            with self.lock:
+                self.stats["timed_out"] += 1
+            raise PoolBusyError("FinBot is busy right now. Please try again in a moment.")
+        finally:
+            with self.lock:
+                self.waiting -= 1
+        
+        with self.lock:
+            self.wait_times.append(time.perf_counter() - start)
+            self.in_flight += 1
+        return agent
+    
+    def _release(self, agent, failed: bool = False):
+        self.agents.put(agent)
+        self.slots.release()
+        with self.lock:
+            self.in_flight -= 1
+            self.stats["errors" if failed else "completed"] += 1
+    
+    def invoke(self, session_id: str, user_message: str) -> str:
+        agent = self._checkout()
+        failed = True
+        try:
+            answer = agent.invoke(user_message, history=self.history(session_id))
+            self._remember(session_id, user_message, answer)
+            failed = False
+            return answer
+        finally:
+            self._release(agent, failed)
+    
+    def stream(self, session_id: str, user_message: str):
+        """Like Agent.stream; the agent is held until the stream is finished or closed"""
+        agent = self._checkout()
+        failed = True
+        try:
+            for event in agent.stream(user_message, history=self.history(session_id)):
+                if event["type"] == "final":
+                    self._remember(session_id, user_message, event["content"])
+                    failed = False
+                yield event
+        finally:
+            self._release(agent, failed)
+    
+    def get_metrics(self) -> dict:
+        """Backpressure metrics: queue depth, agents busy and wait-time percentiles"""
+        with self.lock:
+            waits = sorted(self.wait_times)
+            metrics = dict(self.stats)
+            metrics.update({
+                "pool_size": self.size,
+                "in_flight": self.in_flight,
+                "queue_depth": self.waiting,
+                "max_queue": self.max_queue,
+                "sessions": len(self.sessions)
+            })
+        
+        def percentile(p):
+            return round(waits[min(len(waits) - 1, int(p / 100 * len(waits)))] * 1000, 1) if waits else 0.0
+        
+        metrics["wait_p50_ms"] = percentile(50)
+        metrics["wait_p95_ms"] = percentile(95)
+        return metrics
@@ -1,18 +1,191 @@
-from langchain.agents import initialize_agent, AgentType
+import asyncio
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, ToolMessage
 from langchain_openai import ChatOpenAI
+from tools.tracing import trace, span, record_span, token_usage
 
 class Agent:
-    def __init__(self, name, role, instructions, tools, model="gpt-4o-mini", temperature=0.0):
-        llm = ChatOpenAI(model=model, temperature=temperature)
-        self.agent = initialize_agent(
-            tools=tools,
-            llm=llm,
-            agent=AgentType.OPENAI_FUNCTIONS,
-            verbose=False
-        )
-    
-    def invoke(self, user_message):
-        result = self.agent.run(user_message)
-        
-        return result
-    
\ No newline at end of file
+    """
+    Tool-calling agent. When the model asks for several tools in one step
+    (e.g. a chart and a document search), they run concurrently, so the step
+    takes as long as the slowest tool rather than the sum.
+    
+    fast_path(user_message, tools) can answer simple requests without the
+    model; it returns None to hand the request to the LLM.
+    
+    invoke() traces the turn (tools/tracing.py); stream() records into the
+    caller's trace, since a generator can't hold one open across yields.
+    
+    stream() yields the answer as it is generated, as event dicts:
+    {"type": "token", "content"}, {"type": "tool_start", "name", "args"},
+    {"type": "tool_end", "name", "output", "seconds"} and finally
+    {"type": "final", "content"} with the whole answer.
+    """
+    
+    def __init__(self, name, role, instructions, tools, model="gpt-4o-mini", temperature=0.0, max_steps=6, max_workers=4,
+                 fast_path=None):
+        self.name = name
+        self.role = role
+        self.instructions = instructions
+        self.tools = {t.name: t for t in tools}
+        self.llm = ChatOpenAI(model=model, temperature=temperature, stream_usage=True).bind_tools(tools)
+        self.max_steps = max_steps
+        self.fast_path = fast_path
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-tools")
+    
+    def _try_fast_path(self, user_message):
+        if not self.fast_path:
+            return None
+        try:
+            with span("fast_path") as fast_path_span:
+                answer = self.fast_path(user_message, self.tools)
+                fast_path_span["hit"] = answer is not None
+                return answer
+        except Exception as e:
+            print(f"Warning: fast path failed, using the LLM: {e}")
+            return None
+    
+    def _start_messages(self, user_message, history=None):
+        """System prompt, earlier turns ({"role", "content"} dicts) and the new message"""
+        messages = [SystemMessage(content=self.instructions)]
+        for turn in history or []:
+            message_class = HumanMessage if turn["role"] == "user" else AIMessage
+            messages.append(message_class(content=turn["content"]))
+        messages.append(HumanMessage(content=user_message))
+        return messages
+    
+    def run_tool(self, tool_call) -> ToolMessage:
+        """Run one tool call, turning failures into a message the model can read"""
+        tool = self.tools.get(tool_call["name"])
+        if tool is None:
+            result = f"Unknown tool: {tool_call['name']}"
+        else:
+            with span(f"tool:{tool_call['name']}"):
+                try:
+                    result = tool.invoke(tool_call["args"])
+                except Exception as e:
+                    result = f"Error running {tool_call['name']}: {str(e)}"
+        
+        return ToolMessage(content=str(result), tool_call_id=tool_call["id"], name=tool_call["name"])
+    
+    def run_tools(self, tool_calls):
+        """Run the tool calls of one step on the thread pool, keeping their order"""
+        if len(tool_calls) == 1:
+            return [self.run_tool(tool_calls[0])]
+        futures = [self._submit_tool(tool_call) for tool_call in tool_calls]
+        return [future.result() for future in futures]
+    
+    def _submit_tool(self, tool_call):
+        # Copy the context so tool spans land in this turn's trace
+        return self.executor.submit(contextvars.copy_context().run, self.run_tool, tool_call)
+    
+    def invoke(self, user_message, history=None):
+        with trace("agent.invoke", agent=self.name):
+            return self._invoke(user_message, history)
+    
+    def _invoke(self, user_message, history=None):
+        fast_answer = self._try_fast_path(user_message)
+        if fast_answer is not None:
+            return fast_answer
+        
+        messages = self._start_messages(user_message, history)
+        
+        for step in range(self.max_steps):
+            with span("llm", step=step) as llm_span:
+                response = self.llm.invoke(messages)
+                llm_span.update(token_usage(response), tool_calls=len(response.tool_calls))
+            messages.append(response)
+            
+            if not response.tool_calls:
+                return response.content
+            
+            messages.extend(self.run_tools(response.tool_calls))
+        
+        return "Sorry, I couldn't finish that request. Please try asking in a simpler way."
+    
+    async def ainvoke(self, user_message, history=None):
+        with trace("agent.ainvoke", agent=self.name):
+            return await self._ainvoke(user_message, history)
+    
+    async def _ainvoke(self, user_message, history=None):
+        loop = asyncio.get_running_loop()
+        fast_answer = await loop.run_in_executor(self.executor, contextvars.copy_context().run, self._try_fast_path, user_message)
+        if fast_answer is not None:
+            return fast_answer
+        
+        messages = self._start_messages(user_message, history)
+        
+        for step in range(self.max_steps):
+            with span("llm", step=step) as llm_span:
+                response = await self.llm.ainvoke(messages)
+                llm_span.update(token_usage(response), tool_calls=len(response.tool_calls))
+            messages.append(response)
+            
+            if not response.tool_calls:
+                return response.content
+            
+            # Tools are synchronous, so they run on the pool without blocking the event loop
+            results = await asyncio.gather(*(
+                loop.run_in_executor(self.executor, contextvars.copy_context().run, self.run_tool, tool_call)
+                for tool_call in response.tool_calls
+            ))
+            messages.extend(results)
+        
+        return "Sorry, I couldn't finish that request. Please try asking in a simpler way."
+    
+    def stream(self, user_message, history=None):
+        fast_answer = self._try_fast_path(user_message)
+        if fast_answer is not None:
+            yield {"type": "token", "content": fast_answer}
+            yield {"type": "final", "content": fast_answer}
+            return
+        
+        messages = self._start_messages(user_message, history)
+        
+        for step in range(self.max_steps):
+            # Stream the model's reply; tool call arguments arrive in pieces and are merged
+            response = None
+            llm_start = time.perf_counter()
+            first_token_ms = None
+            for chunk in self.llm.stream(messages):
+                response = chunk if response is None else response + chunk
+                if chunk.content:
+                    if first_token_ms is None:
+                        first_token_ms = round((time.perf_counter() - llm_start) * 1000, 2)
+                    yield {"type": "token", "content": chunk.content}
+            if response is None:
+                # The stream ended without a single chunk; ask again without streaming
+                response = self.llm.invoke(messages)
+                if response.content:
+                    yield {"type": "token", "content": response.content}
+            record_span("llm", llm_start, step=step, first_token_ms=first_token_ms,
+                        tool_calls=len(response.tool_calls), **token_usage(response))
+            messages.append(response)
+            
+            if not response.tool_calls:
+                yield {"type": "final", "content": response.content}
+                return
+            
+            # Run this step's tools concurrently, reporting each as it finishes
+            for tool_call in response.tool_calls:
+                yield {"type": "tool_start", "name": tool_call["name"], "args": tool_call["args"]}
+            
+            started = time.perf_counter()
+            futures = {self._submit_tool(tool_call): i for i, tool_call in enumerate(response.tool_calls)}
+            results = [None] * len(futures)
+            for future in as_completed(futures):
+                tool_message = future.result()
+                results[futures[future]] = tool_message
+                yield {
+                    "type": "tool_end",
+                    "name": tool_message.name,
+                    "output": tool_message.content,
+                    "seconds": round(time.perf_counter() - started, 2)
+                }
+            messages.extend(results)
+        
+        answer = "Sorry, I couldn't finish that request. Please try asking in a simpler way."
+        yield {"type": "token", "content": answer}
+        yield {"type": "final", "content": answer}
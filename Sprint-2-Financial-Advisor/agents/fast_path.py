@@ -0,0 +1,205 @@
+import re
+from datetime import datetime, timedelta
+from typing import Optional
+
+# Company names people type instead of tickers
+COMPANY_TICKERS = {
+    "apple": "AAPL",
+    "microsoft": "MSFT",
+    "google": "GOOGL",
+    "alphabet": "GOOGL",
+    "amazon": "AMZN",
+    "nvidia": "NVDA",
+    "tesla": "TSLA",
+    "meta": "META",
+    "netflix": "NFLX"
+}
+
+# Upper-case words that look like tickers but aren't
+NOT_TICKERS = {"I", "A", "MA", "SMA", "EMA", "USD", "YTD", "VS", "AND", "OR", "THE", "TO", "OF", "FOR", "ME", "MY", "ON", "IN", "AT", "AVG", "CHART", "PLOT", "DAY", "DAYS"}
+
+FIELDS = [
+    (r"\badj(?:usted)?\.?\s+clos(?:e|ing)\b", "Adj Close"),
+    (r"\bclos(?:e|ing)\b", "Close"),
+    (r"\bopen(?:ing)?\b", "Open"),
+    (r"\bhighs?\b", "High"),
+    (r"\blows?\b", "Low"),
+    (r"\bvolume\b", "Volume")
+]
+
+MONTHS = ["january", "february", "march", "april", "may", "june", "july", "august", "september", "october", "november", "december"]
+
+# Anything beyond a plain chart request goes to the LLM, including financial statement
+# subjects ("show me Apple's balance sheet") that the document tools answer
+UNSURE_PATTERNS = (
+    r"\b(why|should|explain|compare|comparison|versus|vs|predict|forecast|recommend|buy|sell|news|earnings|revenue|eps|income|quarter|q[1-4]|and then|also"
+    r"|balance sheet|cash flows?|margins?|expenses?|dividends?|market cap(?:italization)?|r&d|research and development|sales|net income"
+    r"|profit|assets|liabilities|debt|statements?|operating)\b"
+)
+
+# Words a plain chart request may contain besides the ticker, price field, dates and window
+CHART_WORDS = {
+    "plot", "chart", "graph", "show", "draw", "visualize", "visualise", "display", "me", "us", "the", "a", "an",
+    "of", "for", "please", "can", "could", "you", "i", "want", "to", "see", "s", "its", "stock", "share", "shares",
+    "price", "prices", "daily", "with", "and", "from", "since", "after", "between", "until", "through", "in",
+    "during", "last", "past", "day", "days", "d", "week", "weeks", "month", "months", "year", "years", "ytd", "date",
+    "adj", "adjusted", "close", "closing", "open", "opening", "high", "highs", "low", "lows", "volume",
+    "moving", "rolling", "average", "ma", "sma", "volatility", "histogram", "distribution", "over", "time"
+}
+
+CHART_VERBS = r"\b(plot|chart|graph|show|draw|visuali[sz]e|display)\b"
+
+
+def _parse_date(text: str, end: bool = False) -> Optional[str]:
+    """Parse '2023-05-01', 'March 2023' or '2023' (start or end of the period)"""
+    text = text.strip().lower()
+    if re.fullmatch(r"\d{4}-\d{2}-\d{2}", text):
+        return text
+    
+    match = re.fullmatch(r"(" + "|".join(MONTHS) + r")\s+(\d{4})", text)
+    if match:
+        month = MONTHS.index(match.group(1)) + 1
+        year = int(match.group(2))
+        if not end:
+            return f"{year}-{month:02d}-01"
+        next_month = datetime(year + month // 12, month % 12 + 1, 1)
+        return (next_month - timedelta(days=1)).strftime("%Y-%m-%d")
+    
+    if re.fullmatch(r"\d{4}", text):
+        return f"{text}-12-31" if end else f"{text}-01-01"
+    return None
+
+
+def parse_dates(text: str):
+    """Return (start_date, end_date, ok); ok is False when a date was mentioned but not understood"""
+    lowered = text.lower()
+    today = datetime.today()
+    date = r"(\d{4}-\d{2}-\d{2}|(?:" + "|".join(MONTHS) + r")\s+\d{4}|\d{4})"
+    
+    match = re.search(rf"\b(?:from|between)\s+{date}\s+(?:to|and|until|through)\s+{date}", lowered)
+    if match:
+        return _parse_date(match.group(1)), _parse_date(match.group(2), end=True), True
+    
+    match = re.search(rf"\b(?:since|from|after)\s+{date}", lowered)
+    if match:
+        return _parse_date(match.group(1)), None, True
+    
+    match = re.search(rf"\b(?:in|for|during)\s+(\d{{4}})\b", lowered)
+    if match:
+        return _parse_date(match.group(1)), _parse_date(match.group(1), end=True), True
+    
+    match = re.search(r"\b(?:last|past)\s+(\d+)?\s*(day|week|month|year)s?\b", lowered)
+    if match:
+        count = int(match.group(1) or 1)
+        days = {"day": 1, "week": 7, "month": 30, "year": 365}[match.group(2)] * count
+        return (today - timedelta(days=days)).strftime("%Y-%m-%d"), None, True
+    
+    if re.search(r"\b(ytd|year to date)\b", lowered):
+        return f"{today.year}-01-01", None, True
+    
+    # A year or date we couldn't place (e.g. "around 2021") -> not sure
+    if re.search(r"\b\d{4}\b", lowered):
+        return None, None, False
+    return None, None, True
+
+
+def parse_ticker(text: str) -> Optional[str]:
+    """Find exactly one ticker (or known company name); None if missing or ambiguous"""
+    tickers = {word for word in re.findall(r"\b[A-Z]{1,5}\b", text) if word not in NOT_TICKERS}
+    tickers |= {ticker for name, ticker in COMPANY_TICKERS.items() if re.search(rf"\b{name}\b", text, re.IGNORECASE)}
+    return tickers.pop() if len(tickers) == 1 else None
+
+
+def parse_chart_request(text: str) -> Optional[dict]:
+    """
+    Turn a fully specified chart request into a tool call.
+    
+    "plot AAPL adj close since 2023 with a 50-day average" ->
+    {"tool": "plot_rolling_average", "args": {"ticker": "AAPL", "field": "Adj Close", "start_date": "2023-01-01", "window": 50}}
+    
+    Returns None whenever the request is not clearly a single chart.
+    """
+    lowered = text.lower()
+    if not re.search(CHART_VERBS, lowered) or re.search(UNSURE_PATTERNS, lowered):
+        return None
+    
+    ticker = parse_ticker(text)
+    if not ticker:
+        return None
+    
+    # Any other subject ("Apple gross margin", "AAPL dividend history") needs the agent
+    known_words = CHART_WORDS | set(MONTHS) | {ticker.lower()} | set(COMPANY_TICKERS)
+    if any(word not in known_words for word in re.findall(r"[a-z&]+", lowered)):
+        return None
+    
+    start_date, end_date, dates_ok = parse_dates(text)
+    if not dates_ok:
+        return None
+    
+    fields = [name for pattern, name in FIELDS if re.search(pattern, lowered)]
+    if "Adj Close" in fields:
+        fields.remove("Close")
+    if len(fields) > 1:
+        return None
+    
+    args = {"ticker": ticker}
+    if fields:
+        args["field"] = fields[0]
+    if start_date:
+        args["start_date"] = start_date
+    if end_date:
+        args["end_date"] = end_date
+    
+    # "last 30 days" is a date range, not a window
+    window_text = re.sub(r"\b(?:last|past)\s+\d+\s*\w+", " ", lowered)
+    window_match = re.search(r"\b(\d+)[\s-]?(?:day|d)\b", window_text) or re.search(r"\b(?:s?ma)\s?(\d+)\b", window_text)
+    window = int(window_match.group(1)) if window_match else None
+    
+    is_volatility = "volatility" in lowered
+    is_average = bool(re.search(r"\b(moving|rolling)\s+average\b|\baverage\b|\bs?ma\s?\d+\b", lowered))
+    if is_volatility and is_average:
+        return None
+    
+    # The request must say what to chart: a price field, an average, volatility or a date range
+    names_price = bool(fields) or bool(re.search(r"\bprices?\b", lowered))
+    if not (names_price or is_average or is_volatility or start_date or end_date):
+        return None
+    
+    if is_volatility:
+        if not re.search(r"\b(histogram|distribution)\b", lowered):
+            return None
+        tool = "plot_volatility_histogram"
+    elif is_average:
+        tool = "plot_rolling_average"
+    else:
+        # A window without an average or volatility is something we don't understand
+        if window:
+            return None
+        tool = "plot_price_from_local_data"
+    
+    if window:
+        args["window"] = window
+    return {"tool": tool, "args": args}
+
+
+def describe(request: dict) -> str:
+    args = request["args"]
+    field = args.get("field", "Adj Close")
+    period = f"from {args.get('start_date', '2023-01-01')} to {args.get('end_date', 'today')}"
+    if request["tool"] == "plot_rolling_average":
+        return f"{args['ticker']} {field} with a {args.get('window', 20)}-day moving average, {period}"
+    if request["tool"] == "plot_volatility_histogram":
+        return f"{args['ticker']} {args.get('window', 30)}-day rolling volatility distribution, {period}"
+    return f"{args['ticker']} {field} {period}"
+
+
+def try_fast_path(user_message: str, tools: dict) -> Optional[str]:
+    """Answer simple chart requests without the LLM; None means use the agent"""
+    request = parse_chart_request(user_message)
+    if request is None or request["tool"] not in tools:
+        return None
+    
+    result = tools[request["tool"]].invoke(request["args"])
+    if "successfully" not in str(result):
+        return str(result)
+    return f"Here is the {describe(request)}. {result}"
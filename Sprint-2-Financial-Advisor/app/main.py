@@ -108,8 +108,8 @@
 import streamlit as st
 import os
 import sys
-import glob
 import json
+import uuid
 import pandas as pd
 from dotenv import load_dotenv
 
@@ -117,27 +117,55 @@ load_dotenv()
 
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 
-from tools.finance_tools import plot_price_from_local_data, plot_rolling_average, plot_volatility_histogram
-from rag.rag_tool import search_financial_documents
+from tools.finance_tools import plot_price_from_local_data, plot_rolling_average, plot_volatility_histogram, chart_path
+from rag.rag_tool import search_financial_documents, lookup_financial_metric, warm_up, get_rag_status
 from agents.chat_agent import Agent
+from agents.agent_pool import AgentPool, PoolBusyError
+from agents.fast_path import try_fast_path
+from tools.tracing import trace
 
-@st.cache_resource
-def load_agent():
+def create_agent():
     return Agent(
         name="FinBot",
         role="Financial Advisor", 
-        instructions="You are a financial advisor. Use tools to help with stock analysis and plotting.",
-        tools=[plot_price_from_local_data, plot_rolling_average, plot_volatility_histogram, search_financial_documents]
+        instructions="You are a financial advisor. Use tools to help with stock analysis and plotting. "
+                     "When a question needs several tools (e.g. a chart and a document search), call them together in one step.",
+        tools=[plot_price_from_local_data, plot_rolling_average, plot_volatility_histogram, search_financial_documents, lookup_financial_metric],
+        fast_path=try_fast_path
+    )
+
+@st.cache_resource
+def load_agent_pool():
+    # Load the vector store in the background so startup doesn't wait on the corpus
+    warm_up(background=True)
+    # One pool for all browser sessions: a few agents, a bounded wait queue
+    return AgentPool(
+        create_agent,
+        size=int(os.getenv("FINBOT_AGENTS", "4")),
+        max_queue=int(os.getenv("FINBOT_MAX_QUEUE", "16"))
     )
 
-agent = load_agent()
+agent_pool = load_agent_pool()
+
+def show_trace(turn_trace):
+    """Per-span timing and tokens of one answer"""
+    with st.expander(f"⏱ {turn_trace['duration_ms'] / 1000:.2f}s, "
+                     f"{turn_trace['input_tokens'] + turn_trace['output_tokens']} tokens"):
+        for name, entry in sorted(turn_trace["spans"].items(), key=lambda item: -item[1]["duration_ms"]):
+            tokens = entry["input_tokens"] + entry["output_tokens"]
+            token_note = f" · {tokens} tokens" if tokens else ""
+            st.caption(f"{name} ×{entry['count']}: {entry['duration_ms']:.0f} ms{token_note}")
 
 st.title("📈 Financial Bot")
 
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
 if "messages" not in st.session_state:
     st.session_state.messages = []
 if "message_plots" not in st.session_state:
     st.session_state.message_plots = {}
+if "message_traces" not in st.session_state:
+    st.session_state.message_traces = {}
 
 # Form-based input that auto-clears
 with st.form("chat_form", clear_on_submit=True):
@@ -148,17 +176,50 @@ if submitted and user_input:
     st.session_state.messages.append({"role": "user", "content": user_input})
     
     try:
-        response = agent.invoke(user_input)
+        # Stream the answer and tool progress while it's generated; the
+        # finished message is shown with the rest of the conversation below
+        live_output = st.empty()
+        response = ""
+        new_chart = None
+        # Every span of this turn (LLM calls, tools, CSV loads, searches) is recorded
+        with live_output.container(), trace("finbot_turn", session_id=st.session_state.session_id) as turn_trace:
+            with st.chat_message("user"):
+                st.write(user_input)
+            with st.chat_message("assistant"):
+                tool_progress = st.empty()
+                answer_area = st.empty()
+                tool_lines = []
+                
+                for event in agent_pool.stream(st.session_state.session_id, user_input):
+                    if event["type"] == "tool_start":
+                        tool_lines.append(f"⏳ {event['name']}")
+                        tool_progress.caption("  \n".join(tool_lines))
+                    elif event["type"] == "tool_end":
+                        running = tool_lines.index(f"⏳ {event['name']}")
+                        tool_lines[running] = f"✅ {event['name']} ({event['seconds']}s)"
+                        tool_progress.caption("  \n".join(tool_lines))
+                        new_chart = chart_path(event["output"]) or new_chart
+                    elif event["type"] == "token":
+                        response += event["content"]
+                        answer_area.markdown(response + "▌")
+                    elif event["type"] == "final":
+                        response = event["content"]
+        live_output.empty()
+        
         st.session_state.messages.append({"role": "assistant", "content": response})
+        st.session_state.message_traces[len(st.session_state.messages) - 1] = turn_trace.summary()
         
-        # Track plot for this specific message if one was created
-        if "successfully" in response:
-            plots = glob.glob("data/*.png")
-            if plots:
-                latest_plot = max(plots, key=os.path.getctime)
-                message_index = len(st.session_state.messages) - 1
-                st.session_state.message_plots[message_index] = latest_plot
+        # Track the chart this turn's tools saved (fast-path answers name it directly);
+        # other sessions may be saving charts to data/ at the same time
+        new_chart = new_chart or chart_path(response)
+        if new_chart and os.path.exists(new_chart):
+            message_index = len(st.session_state.messages) - 1
+            st.session_state.message_plots[message_index] = new_chart
                 
+    except PoolBusyError as e:
+        live_output.empty()
+        st.session_state.messages.pop()
+        st.warning(str(e))
     except Exception as e:
         st.session_state.messages.append({"role": "assistant", "content": f"Error: {str(e)}"})
         st.error(f"Agent error: {str(e)}")
@@ -180,6 +241,10 @@ while i >= 0:
             # Show the specific plot for this message
             if i in st.session_state.message_plots:
                 st.image(st.session_state.message_plots[i])
+            
+            # Where this answer spent its time
+            if i in st.session_state.message_traces:
+                show_trace(st.session_state.message_traces[i])
         
         i -= 2  # Skip both messages
     else:
@@ -188,6 +253,20 @@ while i >= 0:
             st.write(messages[i]["content"])
         i -= 1
 
+# Document search readiness in Sidebar
+rag_state = get_rag_status()["state"]
+with st.sidebar:
+    if rag_state == "ready":
+        st.caption("📄 Financial documents ready")
+    elif rag_state == "failed":
+        st.caption("📄 Financial documents unavailable")
+    else:
+        st.caption("📄 Loading financial documents...")
+    
+    pool_metrics = agent_pool.get_metrics()
+    st.caption(f"🤖 Agents busy: {pool_metrics['in_flight']}/{pool_metrics['pool_size']} · "
+               f"queued: {pool_metrics['queue_depth']} · wait p95: {pool_metrics['wait_p95_ms']} ms")
+
 # Conversation Export Feature in Sidebar
 if st.session_state.messages:
     with st.sidebar:
@@ -0,0 +1,40 @@
+"""
+Regression check for the chart fast path.
+
+Runs each message in fixtures/fast_path_cases.json through parse_chart_request
+and reports the ones routed differently from the expected tool (null means the
+message must go to the agent, e.g. financial statement questions).
+
+Usage (from the project root):
+    python benchmarks/fast_path_check.py
+"""
+import json
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from agents.fast_path import parse_chart_request
+
+CASES_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "fast_path_cases.json")
+
+
+def main():
+    with open(CASES_PATH) as f:
+        cases = json.load(f)
+    
+    failures = []
+    for case in cases:
+        request = parse_chart_request(case["message"])
+        tool = request["tool"] if request else None
+        if tool != case["tool"]:
+            failures.append((case["message"], case["tool"], tool))
+    
+    print(f"{len(cases) - len(failures)}/{len(cases)} fast path cases pass")
+    for message, expected, routed in failures:
+        print(f"  {message!r}: expected {expected}, got {routed}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,259 @@
+"""
+Offline retrieval benchmark for the RAG tool.
+
+Runs the fixture questions through search_documents (vector only) and
+hybrid_search (what search_financial_documents uses, without the cache) and
+reports recall@k, MRR and latency percentiles for ingest, embed and search,
+plus index build time and process RSS for the chosen vector store backend.
+
+Usage (from the project root):
+    python benchmarks/rag_benchmark.py --embeddings local --k 5
+    python benchmarks/rag_benchmark.py --chunker recursive --chunk-size 800 --chunk-overlap 100 --output results.json
+    python benchmarks/rag_benchmark.py --compare-backends
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List
+from langchain_core.embeddings import Embeddings
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from rag.context_packer import count_tokens
+from rag.document_loader import load_financial_docs
+from rag.embeddings import get_embeddings
+from rag.keyword_index import KeywordIndex
+from rag.vector_store import build_vector_store, search_documents, hybrid_search
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "financial_questions.json")
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process in MB"""
+    try:
+        import psutil
+        return round(psutil.Process().memory_info().rss / 1024 / 1024, 1)
+    except ImportError:
+        # Peak RSS is the best the standard library offers (KB on Linux)
+        import resource
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+class TimedEmbeddings(Embeddings):
+    """Wraps an embedding backend and records how long each call takes"""
+    
+    def __init__(self, embeddings: Embeddings, batch_size: int = 64):
+        self.embeddings = embeddings
+        self.batch_size = batch_size
+        self.document_timings = []
+        self.query_timings = []
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            batch_start = time.perf_counter()
+            vectors.extend(self.embeddings.embed_documents(texts[start:start + self.batch_size]))
+            self.document_timings.append(time.perf_counter() - batch_start)
+        return vectors
+    
+    def embed_query(self, text: str) -> List[float]:
+        start = time.perf_counter()
+        vector = self.embeddings.embed_query(text)
+        self.query_timings.append(time.perf_counter() - start)
+        return vector
+
+
+def percentiles(timings: List[float]) -> dict:
+    """p50/p95/max in milliseconds (nearest rank)"""
+    if not timings:
+        return {"count": 0, "p50_ms": None, "p95_ms": None, "max_ms": None}
+    
+    ordered = sorted(timings)
+    
+    def rank(p):
+        return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))] * 1000
+    
+    return {
+        "count": len(ordered),
+        "p50_ms": round(rank(50), 2),
+        "p95_ms": round(rank(95), 2),
+        "max_ms": round(ordered[-1] * 1000, 2)
+    }
+
+
+def is_relevant(doc, case: dict) -> bool:
+    """A chunk is relevant if it comes from the expected period and contains the expected terms"""
+    metadata = doc.metadata
+    if case.get("fiscal_year") and metadata.get("fiscal_year") != case["fiscal_year"]:
+        return False
+    if case.get("quarter") and metadata.get("quarter") != case["quarter"]:
+        return False
+    if case.get("chunk_ids") and metadata.get("chunk_id") not in case["chunk_ids"]:
+        return False
+    
+    content = doc.page_content.lower()
+    return all(term.lower() in content for term in case.get("expected_terms", []))
+
+
+def evaluate(search_fn, cases: List[dict], k: int) -> dict:
+    """Compute recall@k, MRR and search latency for one search function"""
+    hits = 0
+    reciprocal_ranks = []
+    timings = []
+    misses = []
+    
+    for case in cases:
+        start = time.perf_counter()
+        results = search_fn(case["question"], k)
+        timings.append(time.perf_counter() - start)
+        
+        rank = next((i for i, doc in enumerate(results, 1) if is_relevant(doc, case)), None)
+        if rank:
+            hits += 1
+            reciprocal_ranks.append(1 / rank)
+        else:
+            reciprocal_ranks.append(0.0)
+            misses.append(case["question"])
+    
+    return {
+        f"recall@{k}": round(hits / len(cases), 3),
+        "mrr": round(sum(reciprocal_ranks) / len(cases), 3),
+        "search_latency": percentiles(timings),
+        "misses": misses
+    }
+
+
+def run_benchmark(docs_path: str, embeddings_backend: str, chunk_size: int, chunk_overlap: int, k: int,
+                  fixture_path: str = FIXTURE_PATH, backend: str = "chroma", chunker: str = "layout") -> dict:
+    with open(fixture_path) as f:
+        cases = json.load(f)
+    
+    # Ingest: parse and chunk the PDFs
+    start = time.perf_counter()
+    documents = load_financial_docs(docs_path, chunk_size=chunk_size, chunk_overlap=chunk_overlap, chunker=chunker)
+    ingest_seconds = time.perf_counter() - start
+    
+    embeddings = TimedEmbeddings(get_embeddings(embeddings_backend))
+    rss_before = current_rss_mb()
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Embed and index into a throwaway store so the app's data/ is untouched
+        start = time.perf_counter()
+        vector_store = build_vector_store(documents, embeddings, os.path.join(tmp_dir, "vector_store"), backend)
+        index_seconds = time.perf_counter() - start
+        keyword_index = KeywordIndex.build(documents)
+        
+        embed_build_timings = list(embeddings.document_timings)
+        
+        vector_results = evaluate(lambda q, n: search_documents(q, vector_store, k=n), cases, k)
+        hybrid_results = evaluate(lambda q, n: hybrid_search(q, vector_store, keyword_index, k=n), cases, k)
+        rss_after = current_rss_mb()
+    
+    return {
+        "config": {
+            "embeddings": embeddings_backend,
+            "backend": backend,
+            "chunker": chunker,
+            "chunk_size": chunk_size,
+            "chunk_overlap": chunk_overlap,
+            "k": k,
+            "questions": len(cases),
+            "chunks": len(documents),
+            "chunk_tokens": sum(count_tokens(doc.page_content) for doc in documents)
+        },
+        "ingest_seconds": round(ingest_seconds, 3),
+        "index_build_seconds": round(index_seconds, 3),
+        "rss_mb": {"before_index": rss_before, "after_search": rss_after},
+        "embed_document_batches": percentiles(embed_build_timings),
+        "embed_query": percentiles(embeddings.query_timings),
+        "search_documents": vector_results,
+        "search_financial_documents": hybrid_results
+    }
+
+
+def print_report(report: dict):
+    config = report["config"]
+    print(f"\nRAG benchmark ({config['backend']} backend, {config['embeddings']} embeddings, {config['chunker']} chunker, chunk_size={config['chunk_size']}, "
+          f"chunk_overlap={config['chunk_overlap']}, k={config['k']})")
+    print(f"Questions: {config['questions']}  Chunks: {config['chunks']}  Chunk tokens: {config['chunk_tokens']}")
+    print(f"Ingest (parse + chunk): {report['ingest_seconds']}s  Index build (embed + store): {report['index_build_seconds']}s")
+    print(f"RSS: {report['rss_mb']['before_index']} MB before index, {report['rss_mb']['after_search']} MB after search")
+    print(f"Embed batches: {report['embed_document_batches']}")
+    print(f"Embed query:   {report['embed_query']}")
+    
+    for name in ("search_documents", "search_financial_documents"):
+        result = report[name]
+        recall_key = f"recall@{config['k']}"
+        print(f"\n{name}: {recall_key}={result[recall_key]}  MRR={result['mrr']}")
+        print(f"  latency: {result['search_latency']}")
+        for question in result["misses"]:
+            print(f"  miss: {question}")
+
+
+def compare_backends(args):
+    """Run each backend in its own process so RSS numbers don't mix, then compare"""
+    reports = {}
+    for backend in ("chroma", "flat"):
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as tmp:
+            output_path = tmp.name
+        subprocess.run([
+            sys.executable, __file__,
+            "--backend", backend,
+            "--docs-path", args.docs_path,
+            "--embeddings", args.embeddings,
+            "--chunker", args.chunker,
+            *(["--chunk-size", str(args.chunk_size)] if args.chunk_size else []),
+            *(["--chunk-overlap", str(args.chunk_overlap)] if args.chunk_overlap is not None else []),
+            "--k", str(args.k),
+            "--fixtures", args.fixtures,
+            "--output", output_path
+        ], check=True, stdout=subprocess.DEVNULL)
+        with open(output_path) as f:
+            reports[backend] = json.load(f)
+        os.remove(output_path)
+    
+    print(f"\n{'backend':<8} {'build s':>8} {'search p50 ms':>14} {'search p95 ms':>14} {'RSS MB':>8} {'recall':>7}")
+    for backend, report in reports.items():
+        latency = report["search_documents"]["search_latency"]
+        recall = report["search_documents"][f"recall@{args.k}"]
+        print(f"{backend:<8} {report['index_build_seconds']:>8} {latency['p50_ms']:>14} {latency['p95_ms']:>14} "
+              f"{report['rss_mb']['after_search']:>8} {recall:>7}")
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark RAG retrieval quality and latency")
+    parser.add_argument("--docs-path", default="data/financial_docs/")
+    parser.add_argument("--embeddings", default="local", choices=["local", "openai"])
+    parser.add_argument("--backend", default="chroma", choices=["chroma", "flat"])
+    parser.add_argument("--compare-backends", action="store_true", help="Benchmark chroma and flat side by side")
+    parser.add_argument("--chunker", default="layout", choices=["layout", "recursive"])
+    parser.add_argument("--chunk-size", type=int, help="Tokens for layout, characters for recursive (default 350 / 1000)")
+    parser.add_argument("--chunk-overlap", type=int, help="Default 0 for layout, 500 for recursive")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--fixtures", default=FIXTURE_PATH)
+    parser.add_argument("--output", help="Write the full report as JSON")
+    args = parser.parse_args()
+    
+    if args.compare_backends:
+        reports = compare_backends(args)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(reports, f, indent=2)
+        return
+    
+    report = run_benchmark(args.docs_path, args.embeddings, args.chunk_size, args.chunk_overlap, args.k, args.fixtures, args.backend, args.chunker)
+    print_report(report)
+    
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
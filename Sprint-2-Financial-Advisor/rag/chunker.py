@@ -0,0 +1,154 @@
+import re
+from typing import List
+from langchain_core.documents import Document
+from rag.context_packer import count_tokens
+
+# Bump when the chunking rules change; the ingestion manifest records it so
+# stores built with older rules are re-chunked
+CHUNKER_VERSION = "layout-v1"
+
+# Statement rows: a label followed by figures, e.g. "Services 26,645 23,867"
+ROW_PATTERN = re.compile(r"[A-Za-z].*?(\$\s*)?\(?\d[\d,]*(\.\d+)?\)?\s*$")
+
+
+def is_title(line: str) -> bool:
+    """Statement titles are upper case (ignoring notes like "(Unaudited)")"""
+    letters = re.sub(r"[^A-Za-z]", "", re.sub(r"\(.*?\)", "", line))
+    return len(letters) >= 8 and letters.isupper()
+
+
+def is_section(line: str) -> bool:
+    """Section labels like "Operating expenses:" end with a colon"""
+    return line.endswith(":") and len(line) < 80
+
+
+def split_blocks(page_text: str) -> List[dict]:
+    """
+    Split a page into layout blocks: headings, table rows and prose paragraphs.
+    
+    Consecutive rows form one table block and each block remembers the
+    statement title and section above it, so a table split across chunks
+    keeps its context.
+    """
+    blocks = []
+    context = {"title": None, "section": None}
+    paragraph = []
+    
+    def add_block(kind, lines):
+        blocks.append({"kind": kind, "lines": lines, "title": context["title"], "section": context["section"]})
+    
+    def flush_paragraph():
+        if paragraph:
+            add_block("prose", list(paragraph))
+            paragraph.clear()
+    
+    for raw_line in page_text.splitlines():
+        line = raw_line.strip()
+        if not line:
+            flush_paragraph()
+            continue
+        
+        if is_title(line):
+            flush_paragraph()
+            context.update(title=line, section=None)
+            add_block("heading", [line])
+        elif is_section(line):
+            flush_paragraph()
+            context["section"] = line
+            add_block("heading", [line])
+        elif ROW_PATTERN.match(line):
+            flush_paragraph()
+            previous = blocks[-1] if blocks else None
+            if previous and previous["kind"] == "table" and previous["section"] == context["section"]:
+                previous["lines"].append(line)
+            else:
+                add_block("table", [line])
+        else:
+            paragraph.append(line)
+    
+    flush_paragraph()
+    return blocks
+
+
+def _split_long_block(block: dict, max_tokens: int) -> List[dict]:
+    """Break a block over the budget at row (or sentence) boundaries"""
+    if block["kind"] == "prose":
+        units = re.split(r"(?<=[.!?])\s+(?=[A-Z])", " ".join(block["lines"]))
+    else:
+        units = block["lines"]
+    
+    pieces = []
+    current = []
+    for unit in units:
+        if current and count_tokens("\n".join(current + [unit])) > max_tokens:
+            pieces.append(dict(block, lines=current))
+            current = []
+        current.append(unit)
+    if current:
+        pieces.append(dict(block, lines=current))
+    return pieces
+
+
+def chunk_page(page_text: str, max_tokens: int = 350, overlap_tokens: int = 0) -> List[str]:
+    """
+    Pack one page's blocks into chunks of at most max_tokens.
+    
+    Rows are never split, headings stay with the block below them, and a
+    chunk that starts mid-statement repeats the statement title and section.
+    Up to overlap_tokens of trailing lines (default none) can be carried
+    into the next chunk.
+    """
+    blocks = []
+    for block in split_blocks(page_text):
+        if count_tokens("\n".join(block["lines"])) > max_tokens:
+            blocks.extend(_split_long_block(block, max_tokens))
+        else:
+            blocks.append(block)
+    
+    chunks = []
+    current = []
+    current_kinds = []
+    
+    for block in blocks:
+        text = "\n".join(block["lines"])
+        
+        if current and count_tokens("\n".join(current + [text])) > max_tokens:
+            # Don't leave headings dangling at the end of a chunk
+            while current_kinds and current_kinds[-1] == "heading":
+                current.pop()
+                current_kinds.pop()
+            if current:
+                chunks.append("\n".join(current))
+            
+            carried = []
+            if overlap_tokens:
+                for line in reversed(current):
+                    if count_tokens("\n".join([line] + carried)) > overlap_tokens:
+                        break
+                    carried.insert(0, line)
+            
+            # Restate where we are in the statement
+            for heading in (block["section"], block["title"]):
+                if heading and heading not in carried and heading != text:
+                    carried.insert(0, heading)
+            
+            current = carried
+            current_kinds = ["context"] * len(carried)
+        
+        current.append(text)
+        current_kinds.append(block["kind"])
+    
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def chunk_pages(pages: List[Document], max_tokens: int = 350, overlap_tokens: int = 0) -> List[Document]:
+    """Chunk each page on its own, so no chunk spans a page break"""
+    chunks = []
+    for page in pages:
+        for text in chunk_page(page.page_content, max_tokens, overlap_tokens):
+            metadata = dict(page.metadata)
+            metadata["chunker"] = CHUNKER_VERSION
+            chunks.append(Document(page_content=text, metadata=metadata))
+    return chunks
@@ -0,0 +1,107 @@
+import re
+from typing import List
+from rag.keyword_index import tokenize
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    # tiktoken missing or its encoding can't be downloaded, fall back to ~4 chars per token
+    _encoding = None
+
+
+def count_tokens(text: str) -> int:
+    if _encoding:
+        return len(_encoding.encode(text))
+    return max(1, len(text) // 4)
+
+
+def split_units(text: str) -> List[str]:
+    """Split chunk text into lines and sentences (statement rows stay whole)"""
+    units = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        units.extend(part.strip() for part in re.split(r"(?<=[.!?])\s+(?=[A-Z])", line) if part.strip())
+    return units
+
+
+def _normalize(unit: str) -> str:
+    return re.sub(r"\s+", " ", unit.lower()).strip()
+
+
+def pack_context(query: str, documents, token_budget: int = 800, window: int = 1) -> str:
+    """
+    Pack search results into a token budget.
+    
+    Drops text repeated across overlapping chunks, keeps the lines that match
+    query terms (plus `window` neighbouring lines for context) and fills the
+    budget in order of relevance. Output is grouped by period like the raw results.
+    """
+    query_terms = set(tokenize(query))
+    candidates = []
+    seen = {}
+    
+    for doc_rank, doc in enumerate(documents):
+        metadata = doc.metadata
+        source_key = (metadata.get("source_file"), metadata.get("page"))
+        kept_units = seen.setdefault(source_key, set())
+        
+        # Skip lines already taken from an overlapping chunk of the same page.
+        # Whole lines are compared, so a short figure row inside a longer line is kept.
+        units = []
+        for unit in split_units(doc.page_content):
+            normalized = _normalize(unit)
+            if normalized in kept_units:
+                continue
+            kept_units.add(normalized)
+            units.append(unit)
+        
+        scores = []
+        for unit in units:
+            unit_terms = set(tokenize(unit))
+            score = len(query_terms & unit_terms)
+            # Lines carrying figures are what numeric questions are after
+            if score and re.search(r"\d", unit):
+                score += 0.5
+            scores.append(score)
+        
+        for position, unit in enumerate(units):
+            neighbourhood = scores[max(0, position - window):position + window + 1]
+            best_nearby = max(neighbourhood) if neighbourhood else 0
+            if not best_nearby:
+                continue
+            # Matches rank first, neighbours next, earlier search results break ties
+            relevance = scores[position] if scores[position] else best_nearby * 0.5
+            candidates.append((relevance - doc_rank * 0.01, doc_rank, position, unit))
+    
+    # Nothing matched lexically (semantic-only hits): fall back to the leading lines
+    if not candidates:
+        for doc_rank, doc in enumerate(documents):
+            for position, unit in enumerate(split_units(doc.page_content)[:5]):
+                candidates.append((-doc_rank - position * 0.01, doc_rank, position, unit))
+    
+    # Fill the budget greedily by relevance
+    selected = []
+    used_tokens = 0
+    for relevance, doc_rank, position, unit in sorted(candidates, key=lambda c: c[0], reverse=True):
+        unit_tokens = count_tokens(unit)
+        if used_tokens + unit_tokens > token_budget:
+            continue
+        selected.append((doc_rank, position, unit))
+        used_tokens += unit_tokens
+    
+    # Re-assemble in document order, one block per search result
+    blocks = {}
+    for doc_rank, position, unit in sorted(selected):
+        blocks.setdefault(doc_rank, []).append(unit)
+    
+    packed = ""
+    for doc_rank, units in blocks.items():
+        metadata = documents[doc_rank].metadata
+        quarter = metadata.get('quarter', 'Unknown')
+        year = metadata.get('year', 'Unknown')
+        packed += f"**{quarter} {year}:**\n" + "\n".join(units) + "\n\n"
+    
+    return packed
@@ -2,10 +2,61 @@ import os
 from typing import List, Dict
 from langchain_community.document_loaders import PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from rag.chunker import CHUNKER_VERSION, chunk_pages
 
-def load_financial_docs(docs_path: str = "data/financial_docs/") -> List[Dict]:
+# "layout" (token-based, splits on page/table/section boundaries) or "recursive" (the old character splitter)
+DEFAULT_CHUNKER = os.getenv("RAG_CHUNKER", "layout")
+
+# Default sizes per chunker: tokens for layout, characters for recursive
+CHUNK_DEFAULTS = {
+    "layout": {"chunk_size": 350, "chunk_overlap": 0},
+    "recursive": {"chunk_size": 1000, "chunk_overlap": 500}
+}
+
+def current_chunker_version(chunker: str = None) -> str:
+    """Version string of the chunking rules new ingests will use"""
+    chunker = (chunker or DEFAULT_CHUNKER).lower()
+    return CHUNKER_VERSION if chunker == "layout" else chunker
+
+def parse_period_from_filename(pdf_file: str) -> Dict:
+    """Extract quarter, year and date range from a statement filename"""
+    # Example: FY24_Q1_Consolidated_Financial_Statements.pdf
+    parts = pdf_file.replace('.pdf', '').split('_')
+    fy_year = parts[0]  # FY24 or FY25
+    quarter = parts[1]  # Q1, Q2, etc.
+    
+    # Convert fiscal year to calendar year
+    if fy_year == 'FY24':
+        year = '2024'
+    elif fy_year == 'FY25':
+        year = '2025'
+    else:
+        year = fy_year.replace('FY', '20')
+    
+    # Add date ranges for 2025 quarters
+    if quarter == "Q1" and fy_year == "FY25":
+        quarter_dates = "Oct-Dec 2024"
+    elif quarter == "Q2" and fy_year == "FY25":
+        quarter_dates = "Jan-Mar 2025"
+    else:
+        quarter_dates = f"{quarter} {year}"
+    
+    return {
+        "quarter": quarter,
+        "year": year,
+        "fiscal_year": fy_year,
+        "period": f"{quarter} {year}",
+        "quarter_dates": quarter_dates
+    }
+
+def load_financial_docs(docs_path: str = "data/financial_docs/", chunk_size: int = None, chunk_overlap: int = None,
+                        chunker: str = None) -> List[Dict]:
     """Load and split PDF documents from financial_docs folder"""
     
+    chunker = (chunker or DEFAULT_CHUNKER).lower()
+    chunk_size = chunk_size or CHUNK_DEFAULTS[chunker]["chunk_size"]
+    chunk_overlap = CHUNK_DEFAULTS[chunker]["chunk_overlap"] if chunk_overlap is None else chunk_overlap
+    
     documents = []
     
     # Get all PDF files
@@ -15,18 +66,11 @@ def load_financial_docs(docs_path: str = "data/financial_docs/") -> List[Dict]:
         file_path = os.path.join(docs_path, pdf_file)
         
         # Extract quarter and year from filename
-        # Example: FY24_Q1_Consolidated_Financial_Statements.pdf
-        parts = pdf_file.replace('.pdf', '').split('_')
-        fy_year = parts[0]  # FY24 or FY25
-        quarter = parts[1]  # Q1, Q2, etc.
-        
-        # Convert fiscal year to calendar year
-        if fy_year == 'FY24':
-            year = '2024'
-        elif fy_year == 'FY25':
-            year = '2025'
-        else:
-            year = fy_year.replace('FY', '20')
+        period_info = parse_period_from_filename(pdf_file)
+        quarter = period_info["quarter"]
+        year = period_info["year"]
+        fy_year = period_info["fiscal_year"]
+        quarter_dates = period_info["quarter_dates"]
         
         print(f"Loading {pdf_file}...")
         
@@ -35,24 +79,21 @@ def load_financial_docs(docs_path: str = "data/financial_docs/") -> List[Dict]:
         pages = loader.load()
         
         # Split into chunks
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=500
-        )
-        
-        chunks = text_splitter.split_documents(pages)
-        
-        # Add metadata with date ranges for 2025 quarters
-        if quarter == "Q1" and fy_year == "FY25":
-            quarter_dates = "Oct-Dec 2024"
-        elif quarter == "Q2" and fy_year == "FY25":
-            quarter_dates = "Jan-Mar 2025"
+        if chunker == "layout":
+            chunks = chunk_pages(pages, max_tokens=chunk_size, overlap_tokens=chunk_overlap)
         else:
-            quarter_dates = f"{quarter} {year}"
+            text_splitter = RecursiveCharacterTextSplitter(
+                chunk_size=chunk_size,
+                chunk_overlap=chunk_overlap
+            )
+            chunks = text_splitter.split_documents(pages)
+            for chunk in chunks:
+                chunk.metadata["chunker"] = "recursive"
         
         # Add metadata to each chunk
-        for chunk in chunks:
+        for chunk_index, chunk in enumerate(chunks):
             chunk.metadata.update({
+                "chunk_id": f"{pdf_file}:{chunk.metadata.get('page', 0)}:{chunk_index}",
                 "quarter": quarter,
                 "year": year,
                 "fiscal_year": fy_year,
@@ -0,0 +1,44 @@
+import os
+import math
+import hashlib
+from typing import List
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+from rag.keyword_index import tokenize
+
+
+class LocalHashEmbeddings(Embeddings):
+    """Offline embeddings from hashed word unigrams and bigrams (no model download, no network)"""
+    
+    def __init__(self, dimensions: int = 384):
+        self.dimensions = dimensions
+    
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimensions
+        terms = tokenize(text)
+        features = terms + [f"{a} {b}" for a, b in zip(terms, terms[1:])]
+        
+        for feature in features:
+            digest = hashlib.md5(feature.encode()).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dimensions
+            sign = 1.0 if digest[4] & 1 else -1.0
+            vector[index] += sign
+        
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+    
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+def get_embeddings(backend: str = None) -> Embeddings:
+    """Return the embedding backend set by RAG_EMBEDDINGS ('openai' or 'local')"""
+    backend = (backend or os.getenv("RAG_EMBEDDINGS", "openai")).lower()
+    
+    if backend == "local":
+        return LocalHashEmbeddings()
+    
+    return OpenAIEmbeddings()
@@ -0,0 +1,146 @@
+import os
+import json
+from typing import List, Optional, Tuple
+import numpy as np
+from langchain_core.documents import Document
+
+# Rows scored per matrix multiply; one block covers a corpus of a few thousand chunks
+SEARCH_BLOCK_ROWS = 4096
+
+
+def matches_filter(metadata: dict, filter: Optional[dict]) -> bool:
+    """Chroma-style metadata filter: {"key": value} or {"$and": [...]}"""
+    if not filter:
+        return True
+    for key, value in filter.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, clause) for clause in value):
+                return False
+        elif key == "$or":
+            if not any(matches_filter(metadata, clause) for clause in value):
+                return False
+        elif isinstance(value, dict) and "$eq" in value:
+            if metadata.get(key) != value["$eq"]:
+                return False
+        elif isinstance(value, dict) and "$in" in value:
+            if metadata.get(key) not in value["$in"]:
+                return False
+        elif metadata.get(key) != value:
+            return False
+    return True
+
+
+class FlatVectorIndex:
+    """
+    In-process vector index: a memory-mapped int8 (or float16) matrix with
+    per-vector scales, searched by brute-force dot product.
+    """
+    
+    def __init__(self, vectors: np.ndarray, scales: np.ndarray, documents: List[Document], embedding_function):
+        self.vectors = vectors
+        self.scales = scales
+        self.documents = documents
+        self.embedding_function = embedding_function
+        self.rows_by_id = {doc.metadata.get("chunk_id"): i for i, doc in enumerate(documents)}
+    
+    @property
+    def embeddings(self):
+        return self.embedding_function
+    
+    @staticmethod
+    def quantize(matrix: np.ndarray, dtype: str = "int8") -> Tuple[np.ndarray, np.ndarray]:
+        """Quantize L2-normalized rows to int8 with one scale per row (or to float16)"""
+        if dtype == "float16":
+            return matrix.astype(np.float16), np.ones(len(matrix), dtype=np.float32)
+        
+        scales = np.abs(matrix).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        quantized = np.round(matrix / scales[:, None]).astype(np.int8)
+        return quantized, scales.astype(np.float32)
+    
+    @classmethod
+    def build(cls, documents: List[Document], embeddings, persist_directory: str, dtype: str = "int8"):
+        """Embed the chunks, quantize and save the index, then load it memory-mapped"""
+        matrix = np.asarray(embeddings.embed_documents([doc.page_content for doc in documents]), dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        vectors, scales = cls.quantize(matrix / norms, dtype)
+        
+        os.makedirs(persist_directory, exist_ok=True)
+        np.save(os.path.join(persist_directory, "vectors.npy"), vectors)
+        np.save(os.path.join(persist_directory, "scales.npy"), scales)
+        with open(os.path.join(persist_directory, "documents.json"), "w") as f:
+            json.dump([{"page_content": doc.page_content, "metadata": doc.metadata} for doc in documents], f)
+        
+        return cls.load(persist_directory, embeddings)
+    
+    @classmethod
+    def load(cls, persist_directory: str, embeddings):
+        vectors = np.load(os.path.join(persist_directory, "vectors.npy"), mmap_mode="r")
+        scales = np.load(os.path.join(persist_directory, "scales.npy"))
+        with open(os.path.join(persist_directory, "documents.json")) as f:
+            documents = [Document(page_content=d["page_content"], metadata=d["metadata"]) for d in json.load(f)]
+        return cls(vectors, scales, documents, embeddings)
+    
+    def reconstruct(self, indices) -> np.ndarray:
+        """Dequantize stored vectors (used for re-ranking without re-embedding)"""
+        return np.asarray(self.vectors[indices], dtype=np.float32) * self.scales[indices, None]
+    
+    def vectors_for_ids(self, ids: List[str]) -> Optional[np.ndarray]:
+        """Stored vectors for the given chunk ids, or None if any id is unknown"""
+        rows = [self.rows_by_id.get(chunk_id) for chunk_id in ids]
+        if any(row is None for row in rows):
+            return None
+        return self.reconstruct(rows)
+    
+    def _scores(self, embedding: List[float]) -> np.ndarray:
+        query = np.asarray(embedding, dtype=np.float32)
+        query /= (np.linalg.norm(query) or 1.0)
+        
+        if self.vectors.dtype == np.int8:
+            # Score int8 rows against an int8 query with int32 accumulation (127 * 127 * dims
+            # fits easily), so the memory-mapped matrix is never widened to float32
+            query_int8, query_scale = self.quantize(query[None, :])
+            scores = np.empty(len(self.documents), dtype=np.int32)
+            for start in range(0, len(self.documents), SEARCH_BLOCK_ROWS):
+                block = self.vectors[start:start + SEARCH_BLOCK_ROWS]
+                scores[start:start + len(block)] = np.einsum("ij,j->i", block, query_int8[0], dtype=np.int32)
+            return scores * (self.scales * query_scale[0])
+        
+        scores = np.empty(len(self.documents), dtype=np.float32)
+        for start in range(0, len(self.documents), SEARCH_BLOCK_ROWS):
+            block = np.asarray(self.vectors[start:start + SEARCH_BLOCK_ROWS], dtype=np.float32)
+            scores[start:start + len(block)] = block @ query
+        return scores * self.scales
+    
+    def search_indices(self, embedding: List[float], k: int = 4, filter: Optional[dict] = None) -> List[Tuple[int, float]]:
+        """Return (row, cosine score) pairs for the top k rows"""
+        scores = self._scores(embedding)
+        if filter:
+            mask = np.array([matches_filter(doc.metadata, filter) for doc in self.documents])
+            scores = np.where(mask, scores, -np.inf)
+        
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i])) for i in top if np.isfinite(scores[i])]
+    
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, filter: Optional[dict] = None) -> List[Document]:
+        return [self.documents[i] for i, _ in self.search_indices(embedding, k, filter)]
+    
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: Optional[dict] = None) -> List[Tuple[Document, float]]:
+        embedding = self.embedding_function.embed_query(query)
+        return [(self.documents[i], score) for i, score in self.search_indices(embedding, k, filter)]
+    
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[dict] = None) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+    
+    def get(self, include=None) -> dict:
+        """Chroma-compatible dump of the stored chunks"""
+        return {
+            "ids": [doc.metadata.get("chunk_id", str(i)) for i, doc in enumerate(self.documents)],
+            "documents": [doc.page_content for doc in self.documents],
+            "metadatas": [doc.metadata for doc in self.documents]
+        }
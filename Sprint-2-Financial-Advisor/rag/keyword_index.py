@@ -0,0 +1,96 @@
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import List, Tuple
+from langchain_core.documents import Document
+
+# Numbers keep their separators so "1,234" or "6.11" match the statements exactly
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.,][0-9]+)*")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is",
+    "it", "of", "on", "or", "the", "to", "was", "were", "what", "which", "with",
+    "apple", "s"
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase and split text into searchable terms"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class KeywordIndex:
+    """BM25 inverted index over document chunks, persisted as JSON"""
+    
+    def __init__(self, documents: List[Document], postings: dict, doc_lengths: List[int], k1: float = 1.5, b: float = 0.75):
+        self.documents = documents
+        self.postings = postings
+        self.doc_lengths = doc_lengths
+        self.k1 = k1
+        self.b = b
+        self.avg_length = (sum(doc_lengths) / len(doc_lengths)) if doc_lengths else 0.0
+    
+    @classmethod
+    def build(cls, documents: List[Document]):
+        """Build the inverted index from document chunks"""
+        postings = {}
+        doc_lengths = []
+        
+        for doc_id, doc in enumerate(documents):
+            terms = tokenize(doc.page_content)
+            doc_lengths.append(len(terms))
+            
+            for term, freq in Counter(terms).items():
+                postings.setdefault(term, {})[doc_id] = freq
+        
+        return cls(documents, postings, doc_lengths)
+    
+    def save(self, index_path: str):
+        """Write the index to disk"""
+        os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+        data = {
+            "documents": [
+                {"page_content": doc.page_content, "metadata": doc.metadata}
+                for doc in self.documents
+            ],
+            "postings": self.postings,
+            "doc_lengths": self.doc_lengths
+        }
+        with open(index_path, "w") as f:
+            json.dump(data, f)
+    
+    @classmethod
+    def load(cls, index_path: str):
+        """Load a previously saved index"""
+        with open(index_path) as f:
+            data = json.load(f)
+        
+        documents = [Document(page_content=d["page_content"], metadata=d["metadata"]) for d in data["documents"]]
+        # JSON object keys are strings, convert doc ids back to ints
+        postings = {
+            term: {int(doc_id): freq for doc_id, freq in docs.items()}
+            for term, docs in data["postings"].items()
+        }
+        return cls(documents, postings, data["doc_lengths"])
+    
+    def search(self, query: str, k: int = 10) -> List[Tuple[Document, float]]:
+        """Return the top k chunks by BM25 score"""
+        scores = {}
+        total_docs = len(self.documents)
+        
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            
+            idf = math.log(1 + (total_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            
+            for doc_id, freq in docs.items():
+                length_norm = 1 - self.b + self.b * self.doc_lengths[doc_id] / (self.avg_length or 1)
+                score = idf * freq * (self.k1 + 1) / (freq + self.k1 * length_norm)
+                scores[doc_id] = scores.get(doc_id, 0.0) + score
+        
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(self.documents[doc_id], score) for doc_id, score in ranked]
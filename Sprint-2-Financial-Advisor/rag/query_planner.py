@@ -0,0 +1,119 @@
+import re
+from typing import Dict, List, Optional, Tuple
+from rag.statement_store import METRIC_ALIASES
+
+# Upper bound on searches one compound question can fan out to
+MAX_SUB_QUERIES = 8
+
+QUARTER_WORDS = {"first": "Q1", "second": "Q2", "third": "Q3", "fourth": "Q4"}
+
+# Search phrasing for metrics whose canonical name reads badly
+SEARCH_PHRASES = {
+    "diluted_eps": "diluted earnings per share",
+    "basic_eps": "basic earnings per share",
+    "selling_general_and_administrative": "selling, general and administrative",
+    "total_net_sales": "total net sales"
+}
+
+# Abbreviations spelled out so they match the statement text
+ABBREVIATIONS = {
+    "r&d": "research and development",
+    "sg&a": "selling, general and administrative",
+    "eps": "earnings per share",
+    "opex": "operating expenses"
+}
+
+COMPARISON_WORDS = r"\b(compare|comparison|versus|vs|between|and|how|did|does|what|was|were|is|change|changed|from|to|in|the|of)\b"
+
+
+def extract_periods(query: str) -> List[Tuple[Optional[str], str]]:
+    """
+    Find every quarter mentioned, e.g. 'Q1 vs Q2 2025' -> [(FY25, Q1), (FY25, Q2)].
+    
+    A quarter takes the nearest year written after it (or before it if none follows).
+    """
+    text = re.sub(r"\b(first|second|third|fourth)\s+quarter\b", lambda m: QUARTER_WORDS[m.group(1).lower()], query, flags=re.IGNORECASE)
+    quarters = [(m.start(), f"Q{m.group(1)}") for m in re.finditer(r"\bQ([1-4])\b", text, re.IGNORECASE)]
+    years = [(m.start(), f"FY{(m.group(1) or m.group(2))[-2:]}")
+             for m in re.finditer(r"\bFY\s?'?(\d{2}(?:\d{2})?)\b|\b(20\d{2})\b", text, re.IGNORECASE)]
+    
+    periods = []
+    for position, quarter in quarters:
+        following = [year for start, year in years if start > position]
+        preceding = [year for start, year in years if start < position]
+        fiscal_year = following[0] if following else (preceding[-1] if preceding else None)
+        if (fiscal_year, quarter) not in periods:
+            periods.append((fiscal_year, quarter))
+    return periods
+
+
+def extract_metrics(query: str) -> List[Tuple[str, Optional[str]]]:
+    """Find the metrics asked about as (search phrase, canonical metric) pairs"""
+    normalized = re.sub(r"[^a-z&\s]", " ", query.lower())
+    normalized = re.sub(r"\s+", " ", normalized)
+    
+    # Longest aliases first so 'diluted eps' wins over 'eps'
+    found = []
+    for alias in sorted(METRIC_ALIASES, key=len, reverse=True):
+        match = re.search(rf"(^|\s){re.escape(alias)}($|\s)", normalized)
+        if not match:
+            continue
+        # Blank out the match (same length) so shorter aliases can't reuse it
+        normalized = normalized[:match.start()] + " " * len(match.group(0)) + normalized[match.end():]
+        metric = METRIC_ALIASES[alias]
+        if metric not in [m for _, _, m in found]:
+            found.append((match.start(), SEARCH_PHRASES.get(metric, metric.replace("_", " ")), metric))
+    
+    # Keep the order the user wrote them in
+    metrics = [(phrase, metric) for _, phrase, metric in sorted(found)]
+    return metrics
+
+
+def topic_without_periods(query: str) -> str:
+    """Strip periods and comparison words, leaving what is being asked about"""
+    topic = re.sub(r"\b(Q[1-4]|FY\s?'?\d{2,4}|20\d{2}|(first|second|third|fourth)\s+quarter)\b", " ", query, flags=re.IGNORECASE)
+    topic = re.sub(COMPARISON_WORDS, " ", topic, flags=re.IGNORECASE)
+    for abbreviation, expansion in ABBREVIATIONS.items():
+        topic = re.sub(rf"(?<![\w&]){re.escape(abbreviation)}(?![\w&])", expansion, topic, flags=re.IGNORECASE)
+    topic = re.sub(r"[^\w&,\s]|\s+", " ", topic).strip(" ,")
+    return topic or query
+
+
+def plan_sub_queries(query: str) -> List[Dict]:
+    """
+    Split a compound question into one search per period and metric.
+    
+    Returns an empty list for single-period, single-metric questions, which
+    go through the normal search.
+    """
+    periods = extract_periods(query)
+    metrics = extract_metrics(query)
+    if len(periods) < 2 and len(metrics) < 2:
+        return []
+    
+    # One metric across periods: search the user's own wording ('iPhone sales'
+    # is not total net sales), spelled out
+    if len(metrics) < 2:
+        metrics = [(topic_without_periods(query), metrics[0][1] if metrics else None)]
+    if not periods:
+        periods = [(None, None)]
+    
+    sub_queries = []
+    for fiscal_year, quarter in periods:
+        for phrase, metric in metrics:
+            filters = {}
+            if fiscal_year:
+                filters["fiscal_year"] = fiscal_year
+            if quarter:
+                filters["quarter"] = quarter
+            
+            period_label = " ".join(part for part in (quarter, fiscal_year) if part)
+            sub_queries.append({
+                "query": phrase,
+                "metric": metric,
+                "phrase": phrase,
+                "period": period_label or "All periods",
+                "filters": filters
+            })
+    
+    return sub_queries[:MAX_SUB_QUERIES]
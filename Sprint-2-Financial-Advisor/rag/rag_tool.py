@@ -1,16 +1,203 @@
 import os
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import Optional
 from langchain.tools import tool
-from rag.vector_store import create_vector_store, search_documents
+from rag.context_packer import pack_context
+from rag.query_planner import plan_sub_queries
+from tools.tracing import span
+from rag.statement_store import ensure_statement_store, lookup_metric, resolve_metric
+from rag.vector_store import create_vector_store, load_keyword_index, read_manifest_version, search_documents, hybrid_search, multi_query_search
 
-# Initialize vector store globally
-try:
-    vector_store = create_vector_store()
-except Exception as e:
-    print(f"Warning: Could not initialize vector store: {e}")
-    vector_store = None
+# Token budget for the text one search returns to the agent
+CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKENS", "800"))
+
+# Vector store and keyword index are loaded on first use (or by warm_up)
+vector_store = None
+keyword_index = None
+
+rag_status = {"state": "not_started", "error": None, "load_seconds": None}
+_init_lock = threading.Lock()
+_ready = threading.Event()
+
+def initialize_rag():
+    """Load the vector store and keyword index once, on first use"""
+    global vector_store, keyword_index
+    
+    with _init_lock:
+        if rag_status["state"] == "ready":
+            return
+        
+        rag_status.update({"state": "loading", "error": None})
+        _ready.clear()
+        start = time.perf_counter()
+        
+        try:
+            vector_store = create_vector_store()
+        except Exception as e:
+            print(f"Warning: Could not initialize vector store: {e}")
+            rag_status.update({"state": "failed", "error": str(e)})
+            _ready.set()
+            return
+        
+        # Keyword index for exact line-item terms
+        try:
+            keyword_index = load_keyword_index(vector_store)
+        except Exception as e:
+            print(f"Warning: Could not load keyword index: {e}")
+            keyword_index = None
+        
+        rag_status.update({"state": "ready", "load_seconds": round(time.perf_counter() - start, 2)})
+        _ready.set()
+
+def warm_up(background: bool = True):
+    """Start loading the vector store, optionally in a background thread"""
+    if rag_status["state"] in ("loading", "ready"):
+        return
+    
+    if background:
+        rag_status["state"] = "loading"
+        _ready.clear()
+        threading.Thread(target=initialize_rag, name="rag-warm-up", daemon=True).start()
+    else:
+        initialize_rag()
+
+def get_rag_status() -> dict:
+    """Report whether financial documents are ready to search"""
+    return dict(rag_status)
+
+
+class SearchCache:
+    """LRU + TTL cache of search results keyed by query, k, filters and index version"""
+    
+    def __init__(self, max_size: int = 256, ttl_seconds: float = 900, manifest_path: str = "data/ingest_manifest.json"):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.manifest_path = manifest_path
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.index_version = None
+        self.manifest_mtime = None
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+    
+    def current_version(self) -> str:
+        """Read the manifest version, clearing the cache when it changes"""
+        try:
+            mtime = os.path.getmtime(self.manifest_path)
+        except OSError:
+            mtime = None
+        
+        with self.lock:
+            if mtime != self.manifest_mtime or self.index_version is None:
+                version = read_manifest_version(self.manifest_path)
+                if self.index_version is not None and version != self.index_version:
+                    self.entries.clear()
+                    self.stats["invalidations"] += 1
+                self.index_version = version
+                self.manifest_mtime = mtime
+            
+            return self.index_version
+    
+    def make_key(self, query: str, k: int, filters=None):
+        normalized_query = re.sub(r"\s+", " ", query.strip().lower())
+        filter_key = tuple(sorted(filters.items())) if filters else None
+        return (normalized_query, k, filter_key, self.current_version())
+    
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            
+            stored_at, value = entry
+            if time.time() - stored_at > self.ttl_seconds:
+                del self.entries[key]
+                self.stats["expirations"] += 1
+                self.stats["misses"] += 1
+                return None
+            
+            self.entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return value
+    
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.time(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.stats["evictions"] += 1
+    
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+search_cache = SearchCache()
+
+def get_search_cache_stats() -> dict:
+    """Report search cache hit rates for sizing"""
+    stats = dict(search_cache.stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+    stats["size"] = len(search_cache.entries)
+    stats["max_size"] = search_cache.max_size
+    stats["index_version"] = search_cache.index_version
+    return stats
+
+def cached_search(query: str, k: int, filters=None):
+    """Run a document search through the query cache"""
+    with span("rag_search", k=k) as search_span:
+        cache_key = search_cache.make_key(query, k, filters)
+        results = search_cache.get(cache_key)
+        search_span["cache_hit"] = results is not None
+        if results is not None:
+            return results
+        
+        # Search for relevant documents (keyword + vector when the index is available)
+        if keyword_index:
+            results = hybrid_search(query, vector_store, keyword_index, k=k)
+        else:
+            results = search_documents(query, vector_store, k=k)
+        
+        search_cache.put(cache_key, results)
+        return results
+
+def cached_multi_search(sub_queries, k: int):
+    """Run the sub-queries of a compound question, searching only those not cached"""
+    keys = [search_cache.make_key(sub["query"], k, sub["filters"]) for sub in sub_queries]
+    results = [search_cache.get(key) for key in keys]
+    
+    missing = [i for i, cached in enumerate(results) if cached is None]
+    fresh = multi_query_search([sub_queries[i] for i in missing], vector_store, keyword_index, k=k)
+    for i, docs in zip(missing, fresh):
+        search_cache.put(keys[i], docs)
+        results[i] = docs
+    
+    return results
+
+def format_multi_results(query: str, sub_queries, results) -> str:
+    """Merge sub-query results into one answer, grouped by period"""
+    budget = max(200, CONTEXT_TOKEN_BUDGET // len(sub_queries))
+    periods = {}
+    for sub, docs in zip(sub_queries, results):
+        periods.setdefault(sub["period"], []).append((sub, docs))
+    
+    response = f"Financial information for '{query}' ({len(sub_queries)} searches, by period):\n\n"
+    for period, entries in periods.items():
+        response += f"### {period}\n\n"
+        for sub, docs in entries:
+            if len(entries) > 1:
+                response += f"_{sub['phrase']}_\n"
+            response += pack_context(sub["query"], docs, token_budget=budget) if docs else "No matching information found.\n\n"
+    
+    return response
 
 @tool
-def search_financial_documents(query: str, max_results: int = 10):
+def search_financial_documents(query: str, max_results: int = 5):
     """
     Search Apple's financial documents for specific information.
     
@@ -22,6 +209,9 @@ def search_financial_documents(query: str, max_results: int = 10):
     - Balance sheet items
     - Cash flow information
     
+    Compound questions like "R&D in Q1 vs Q2 2025" are split into one search
+    per period and metric, so a single call covers the whole comparison.
+    
     Args:
         query (str): Search query for financial information
         max_results (int): Maximum number of results to return
@@ -30,28 +220,120 @@ def search_financial_documents(query: str, max_results: int = 10):
         str: Relevant financial information from documents
     """
     
+    # Load on first use, or give a background warm-up a few seconds to finish
+    if rag_status["state"] == "loading":
+        if not _ready.wait(timeout=5):
+            return "Financial documents are still loading. Please try again in a moment."
+    elif rag_status["state"] != "ready":
+        initialize_rag()
+    
     if not vector_store:
-        return "Financial documents not available. Vector store not initialized."
+        return f"Financial documents not available. Vector store not initialized: {rag_status['error']}"
     
     try:
-        # Search for relevant documents
-        results = search_documents(query, vector_store, k=max_results)
+        # Cross-quarter or multi-metric questions: batched, concurrent sub-searches
+        sub_queries = plan_sub_queries(query)
+        if sub_queries:
+            return format_multi_results(query, sub_queries, cached_multi_search(sub_queries, max_results))
+        
+        # Search for relevant documents (repeated queries are served from the cache)
+        results = cached_search(query, max_results)
         
         if not results:
             return f"No relevant financial information found for: {query}"
         
-        # Format results
+        # Format results: de-duplicated, query-relevant lines within the token budget
         response = f"Financial information for '{query}':\n\n"
+        response += pack_context(query, results, token_budget=CONTEXT_TOKEN_BUDGET)
         
-        for i, doc in enumerate(results, 1):
-            metadata = doc.metadata
-            quarter = metadata.get('quarter', 'Unknown')
-            year = metadata.get('year', 'Unknown')
-            
-            response += f"**{quarter} {year}:**\n"
-            response += f"{doc.page_content[:500]}...\n\n"
+        return response
+        
+    except Exception as e:
+        return f"Error searching financial documents: {str(e)}"
+
+def parse_period(period: str):
+    """Parse 'Q2 2025', 'Q2 FY25' or 'FY25 Q2' into (fiscal_year, quarter)"""
+    quarter_match = re.search(r"\bQ([1-4])\b", period, re.IGNORECASE)
+    year_match = re.search(r"\b(?:FY\s?)?(?:20)?(\d{2})\b", re.sub(r"\bQ[1-4]\b", "", period, flags=re.IGNORECASE), re.IGNORECASE)
+    quarter = f"Q{quarter_match.group(1)}" if quarter_match else None
+    fiscal_year = f"FY{year_match.group(1)}" if year_match else None
+    return fiscal_year, quarter
+
+def format_metric_value(metric: str, value: float) -> str:
+    if metric and metric.endswith("_eps"):
+        return f"${value:,.2f} per share"
+    return f"${value:,.0f} million"
+
+def is_previous_quarter(previous: dict, row: dict) -> bool:
+    """Whether `previous` is the quarter right before `row` in the same fiscal year"""
+    return (previous["fiscal_year"] == row["fiscal_year"]
+            and int(previous["quarter"][1]) + 1 == int(row["quarter"][1]))
+
+@tool
+def lookup_financial_metric(metric: str, period: Optional[str] = None, compare_previous_quarter: bool = True):
+    """
+    Look up an exact figure from Apple's financial statements.
+    
+    Use this (instead of search_financial_documents) when user asks for a number:
+    - Revenue / net sales, products or services net sales
+    - Net income, EPS (basic or diluted), gross margin, operating income
+    - R&D, SG&A, total operating expenses
+    - Cash and cash equivalents, total assets, cash flow lines
+    - Quarter-over-quarter change of any of these (for year-to-date cash flow
+      lines, the quarter's own amount instead)
+    
+    Args:
+        metric (str): Metric name, e.g. 'revenue', 'diluted EPS', 'R&D'
+        period (str, optional): Period like 'Q2 2025' or 'Q1 FY25' (default: all periods)
+        compare_previous_quarter (bool): Include the previous quarter and the change
+    
+    Returns:
+        str: Metric values by period
+    """
+    
+    try:
+        if not ensure_statement_store():
+            return "Financial statement data not available. Add PDFs to data/financial_docs/."
+        
+        rows = lookup_metric(metric)
+        if not rows:
+            return f"No statement line item found for '{metric}'. Try search_financial_documents instead."
+        
+        # Narrow to the requested period (and the quarter before it for comparisons)
+        if period:
+            fiscal_year, quarter = parse_period(period)
+            positions = [
+                i for i, row in enumerate(rows)
+                if (not fiscal_year or row["fiscal_year"] == fiscal_year) and (not quarter or row["quarter"] == quarter)
+            ]
+            if not positions:
+                available = ", ".join(f"{row['quarter']} {row['fiscal_year']}" for row in rows)
+                return f"No '{metric}' figure for {period}. Available periods: {available}"
+            start = max(positions[0] - 1, 0) if compare_previous_quarter else positions[0]
+            rows = rows[start:positions[-1] + 1]
+        
+        canonical_metric = resolve_metric(metric)
+        response = f"{rows[0]['label']} ({rows[0]['statement'].replace('_', ' ')} statement):\n"
+        
+        # Cash flow statements report fiscal year-to-date figures, so a percentage
+        # change between two of them means nothing; the quarter's own amount is the difference
+        year_to_date = rows[0]["statement"] == "cash_flows"
+        
+        previous = None
+        for row in rows:
+            line = f"- {row['quarter']} {row['fiscal_year']} ({row['quarter_dates']}): {format_metric_value(canonical_metric, row['value'])}"
+            if year_to_date:
+                line += " year-to-date"
+                if compare_previous_quarter and previous and is_previous_quarter(previous, row):
+                    quarter_only = row["value"] - previous["value"]
+                    line += f" ({format_metric_value(canonical_metric, quarter_only)} in {row['quarter']} alone)"
+            elif compare_previous_quarter and previous and previous["value"]:
+                change = (row["value"] - previous["value"]) / abs(previous["value"]) * 100
+                line += f" ({change:+.1f}% vs {previous['quarter']} {previous['fiscal_year']})"
+            response += line + "\n"
+            previous = row
         
         return response
         
     except Exception as e:
-        return f"Error searching financial documents: {str(e)}"
\ No newline at end of file
+        return f"Error looking up financial metric: {str(e)}"
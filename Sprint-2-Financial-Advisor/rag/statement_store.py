@@ -0,0 +1,281 @@
+import os
+import re
+import sqlite3
+from typing import List, Dict, Optional
+from langchain_community.document_loaders import PyPDFLoader
+from rag.document_loader import parse_period_from_filename
+
+# Page headings that identify which statement a page belongs to
+STATEMENT_HEADINGS = [
+    ("comprehensive_income", "STATEMENTS OF COMPREHENSIVE INCOME"),
+    ("operations", "STATEMENTS OF OPERATIONS"),
+    ("balance_sheet", "BALANCE SHEETS"),
+    ("shareholders_equity", "STATEMENTS OF SHAREHOLDERS"),
+    ("cash_flows", "STATEMENTS OF CASH FLOWS"),
+]
+
+# Canonical metrics: (statement, section or None, label pattern)
+METRIC_LABELS = {
+    "products_net_sales": ("operations", "net sales", r"^products$"),
+    "services_net_sales": ("operations", "net sales", r"^services$"),
+    "total_net_sales": ("operations", None, r"^total net sales$"),
+    "total_cost_of_sales": ("operations", None, r"^total cost of sales$"),
+    "gross_margin": ("operations", None, r"^gross margin$"),
+    "research_and_development": ("operations", None, r"^research and development$"),
+    "selling_general_and_administrative": ("operations", None, r"^selling, general and administrative$"),
+    "total_operating_expenses": ("operations", None, r"^total operating expenses$"),
+    "operating_income": ("operations", None, r"^operating income$"),
+    "income_before_taxes": ("operations", None, r"^income before provision for income taxes$"),
+    "provision_for_income_taxes": ("operations", None, r"^provision for income taxes$"),
+    "net_income": ("operations", None, r"^net income$"),
+    "basic_eps": ("operations", "earnings per share", r"^basic$"),
+    "diluted_eps": ("operations", "earnings per share", r"^diluted$"),
+    "cash_and_cash_equivalents": ("balance_sheet", None, r"^cash and cash equivalents$"),
+    "total_assets": ("balance_sheet", None, r"^total assets$"),
+    "total_liabilities": ("balance_sheet", None, r"^total liabilities$"),
+    "total_shareholders_equity": ("balance_sheet", None, r"^total shareholders.? equity$"),
+    "depreciation_and_amortization": ("cash_flows", None, r"^depreciation and amortization$"),
+    "cash_from_operations": ("cash_flows", None, r"^cash generated by operating activities$"),
+    "cash_from_investing": ("cash_flows", None, r"^cash (generated by|used in) investing activities$"),
+    "cash_from_financing": ("cash_flows", None, r"^cash used in financing activities$"),
+}
+
+# How users refer to the canonical metrics
+METRIC_ALIASES = {
+    "revenue": "total_net_sales",
+    "revenues": "total_net_sales",
+    "net sales": "total_net_sales",
+    "total net sales": "total_net_sales",
+    "sales": "total_net_sales",
+    "products": "products_net_sales",
+    "product sales": "products_net_sales",
+    "services": "services_net_sales",
+    "services revenue": "services_net_sales",
+    "services net sales": "services_net_sales",
+    "cost of sales": "total_cost_of_sales",
+    "gross margin": "gross_margin",
+    "gross profit": "gross_margin",
+    "r&d": "research_and_development",
+    "research and development": "research_and_development",
+    "sg&a": "selling_general_and_administrative",
+    "operating expenses": "total_operating_expenses",
+    "opex": "total_operating_expenses",
+    "operating income": "operating_income",
+    "net income": "net_income",
+    "profit": "net_income",
+    "earnings": "net_income",
+    "eps": "diluted_eps",
+    "diluted eps": "diluted_eps",
+    "earnings per share": "diluted_eps",
+    "basic eps": "basic_eps",
+    "cash": "cash_and_cash_equivalents",
+    "cash and cash equivalents": "cash_and_cash_equivalents",
+    "total assets": "total_assets",
+    "total liabilities": "total_liabilities",
+    "shareholders equity": "total_shareholders_equity",
+    "operating cash flow": "cash_from_operations",
+    "cash from operations": "cash_from_operations",
+    "investing cash flow": "cash_from_investing",
+    "financing cash flow": "cash_from_financing",
+    "income taxes": "provision_for_income_taxes",
+}
+
+NUMBER_PATTERN = re.compile(r"\(?\$?\s*\d[\d,]*(?:\.\d+)?\)?")
+MONTHS = ("january", "february", "march", "april", "may", "june", "july",
+          "august", "september", "october", "november", "december")
+
+
+def parse_number(token: str) -> float:
+    """Convert '1,234', '$ 6.11' or '(1,234)' to a float"""
+    negative = token.startswith("(") and token.endswith(")")
+    value = float(re.sub(r"[^\d.]", "", token))
+    return -value if negative else value
+
+
+def detect_statement(page_text: str) -> Optional[str]:
+    """Identify the financial statement on a page from its heading"""
+    upper_text = page_text.upper()
+    for statement, heading in STATEMENT_HEADINGS:
+        if heading in upper_text:
+            return statement
+    return None
+
+
+def parse_line_items(page_text: str) -> List[Dict]:
+    """Split statement lines into label, section and numeric columns"""
+    items = []
+    section = None
+    
+    for raw_line in page_text.splitlines():
+        line = raw_line.strip()
+        if not line:
+            continue
+        
+        first_number = NUMBER_PATTERN.search(line)
+        label = (line[:first_number.start()] if first_number else line).strip(" $:.").strip()
+        
+        # Lines like "Net sales:" open a section for the lines below them
+        if not first_number:
+            if line.endswith(":"):
+                section = label.lower()
+            continue
+        
+        # Skip column headers ("March 29, 2025") and note references
+        if not label or not re.search(r"[A-Za-z]", label) or label.lower().startswith(MONTHS):
+            continue
+        
+        values = [parse_number(token) for token in NUMBER_PATTERN.findall(line[first_number.start():])]
+        items.append({"label": label, "section": section, "values": values})
+        
+        # Totals close the section they summarize
+        if label.lower().startswith("total"):
+            section = None
+    
+    return items
+
+
+def match_metric(statement: str, section: Optional[str], label: str) -> Optional[str]:
+    """Map a statement line to its canonical metric name"""
+    label_lower = label.lower().replace("’", "'")
+    for metric, (metric_statement, metric_section, pattern) in METRIC_LABELS.items():
+        if metric_statement != statement:
+            continue
+        if metric_section and (not section or not section.startswith(metric_section)):
+            continue
+        if re.match(pattern, label_lower):
+            return metric
+    return None
+
+
+def build_statement_store(docs_path: str = "data/financial_docs/", db_path: str = "data/financial_statements.db") -> int:
+    """Extract statement line items from the PDFs into a SQLite table"""
+    pdf_files = sorted(f for f in os.listdir(docs_path) if f.endswith('.pdf'))
+    
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.execute("DROP TABLE IF EXISTS line_items")
+    conn.execute("""
+        CREATE TABLE line_items (
+            source_file TEXT,
+            fiscal_year TEXT,
+            quarter TEXT,
+            period TEXT,
+            quarter_dates TEXT,
+            statement TEXT,
+            section TEXT,
+            label TEXT,
+            metric TEXT,
+            column_index INTEGER,
+            value REAL,
+            page INTEGER
+        )
+    """)
+    
+    row_count = 0
+    for pdf_file in pdf_files:
+        period_info = parse_period_from_filename(pdf_file)
+        pages = PyPDFLoader(os.path.join(docs_path, pdf_file)).load()
+        
+        for page in pages:
+            statement = detect_statement(page.page_content)
+            if not statement:
+                continue
+            
+            for item in parse_line_items(page.page_content):
+                metric = match_metric(statement, item["section"], item["label"])
+                
+                # Column 0 is the current period of the filing, later columns are comparatives
+                for column_index, value in enumerate(item["values"]):
+                    conn.execute(
+                        "INSERT INTO line_items VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (pdf_file, period_info["fiscal_year"], period_info["quarter"], period_info["period"],
+                         period_info["quarter_dates"], statement, item["section"], item["label"], metric,
+                         column_index, value, page.metadata.get("page", 0))
+                    )
+                    row_count += 1
+    
+    conn.execute("CREATE INDEX idx_line_items_metric ON line_items (metric, fiscal_year, quarter, column_index)")
+    conn.execute("CREATE INDEX idx_line_items_label ON line_items (label)")
+    conn.commit()
+    conn.close()
+    
+    # An empty store would look ready on the next start; leave nothing behind instead
+    if not row_count:
+        os.remove(db_path)
+        print("Warning: No statement line items found, statement store not created")
+        return 0
+    
+    print(f"Statement store created with {row_count} line item values")
+    return row_count
+
+
+def resolve_metric(name: str) -> Optional[str]:
+    """Turn a user phrase like 'R&D' or 'diluted EPS' into a canonical metric"""
+    normalized = re.sub(r"[^a-z&\s]", " ", name.lower())
+    normalized = re.sub(r"\s+", " ", normalized).strip()
+    if normalized.replace(" ", "_") in METRIC_LABELS:
+        return normalized.replace(" ", "_")
+    
+    # Prefer the longest alias contained in the phrase
+    for alias in sorted(METRIC_ALIASES, key=len, reverse=True):
+        if re.search(rf"(^|\s){re.escape(alias)}($|\s)", normalized):
+            return METRIC_ALIASES[alias]
+    return None
+
+
+def lookup_metric(metric_name: str, fiscal_year: Optional[str] = None, quarter: Optional[str] = None,
+                  db_path: str = "data/financial_statements.db") -> List[Dict]:
+    """Look up current-period values of a metric, oldest period first"""
+    metric = resolve_metric(metric_name)
+    
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    
+    if metric:
+        query = "SELECT * FROM line_items WHERE metric = ? AND column_index = 0"
+        params = [metric]
+    else:
+        # Fall back to the raw statement label for line items without an alias
+        query = "SELECT * FROM line_items WHERE LOWER(label) = ? AND column_index = 0"
+        params = [metric_name.lower().strip()]
+    
+    if fiscal_year:
+        query += " AND fiscal_year = ?"
+        params.append(fiscal_year)
+    if quarter:
+        query += " AND quarter = ?"
+        params.append(quarter)
+    
+    query += " ORDER BY fiscal_year, quarter, page"
+    rows = [dict(row) for row in conn.execute(query, params).fetchall()]
+    conn.close()
+    
+    # Keep the first occurrence per period (e.g. cash appears on several statements)
+    seen = set()
+    results = []
+    for row in rows:
+        key = (row["fiscal_year"], row["quarter"])
+        if key not in seen:
+            seen.add(key)
+            results.append(row)
+    return results
+
+
+
+def count_line_items(db_path: str = "data/financial_statements.db") -> int:
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM line_items").fetchone()[0]
+    except sqlite3.Error:
+        return 0
+    finally:
+        conn.close()
+
+
+def ensure_statement_store(docs_path: str = "data/financial_docs/", db_path: str = "data/financial_statements.db") -> bool:
+    """Build the statement store if it doesn't exist yet (or was left empty)"""
+    if os.path.exists(db_path) and count_line_items(db_path) > 0:
+        return True
+    if not os.path.isdir(docs_path):
+        return False
+    return build_statement_store(docs_path, db_path) > 0
@@ -1,21 +1,60 @@
 import os
+import re
+import json
+import hashlib
+import shutil
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import numpy as np
 import chromadb
 from langchain_community.vectorstores import Chroma
-from langchain_openai import OpenAIEmbeddings
-from rag.document_loader import load_financial_docs
+from langchain_core.documents import Document
+from rag.document_loader import load_financial_docs, current_chunker_version
+from rag.embeddings import get_embeddings
+from rag.flat_index import FlatVectorIndex, matches_filter
+from rag.keyword_index import KeywordIndex
+from rag.statement_store import build_statement_store
+from tools.tracing import span
 
-def create_vector_store(persist_directory: str = "data/chroma_db"):
-    """Create or load existing ChromaDB vector store"""
+# Vector store backends: "chroma" (default) or "flat" (in-process int8 index)
+DEFAULT_PERSIST_DIRECTORIES = {
+    "chroma": "data/chroma_db",
+    "flat": "data/flat_index"
+}
+
+# MMR trade-off: 1.0 ranks by relevance only, lower values favour distinct chunks
+MMR_LAMBDA = float(os.getenv("RAG_MMR_LAMBDA", "0.7"))
+
+# Set RAG_REBUILD_INDEX=1 to re-chunk and re-embed an existing store on start
+REBUILD_INDEX = os.getenv("RAG_REBUILD_INDEX", "").lower() in ("1", "true", "yes")
+
+def get_backend(backend: str = None) -> str:
+    return (backend or os.getenv("RAG_VECTOR_BACKEND", "chroma")).lower()
+
+def create_vector_store(persist_directory: str = None, index_path: str = "data/keyword_index.json", manifest_path: str = "data/ingest_manifest.json", backend: str = None):
+    """Create or load existing vector store (ChromaDB or flat int8 index)"""
+    backend = get_backend(backend)
+    persist_directory = persist_directory or DEFAULT_PERSIST_DIRECTORIES[backend]
+    
+    # Stores chunked with older rules are rebuilt. A store with no recorded chunker
+    # version predates versioning: re-embedding costs API calls, so only on request.
+    if os.path.exists(persist_directory):
+        recorded_chunker = read_manifest_chunker(manifest_path)
+        if REBUILD_INDEX or (recorded_chunker and recorded_chunker != current_chunker_version()):
+            print("Re-chunking documents..." if REBUILD_INDEX else "Chunking rules changed, re-chunking documents...")
+            shutil.rmtree(persist_directory)
+            if os.path.exists(index_path):
+                os.remove(index_path)
+        elif not recorded_chunker:
+            print(f"Warning: {persist_directory} has no recorded chunker version and may use old chunking rules. "
+                  "Set RAG_REBUILD_INDEX=1 to re-chunk and re-embed the documents.")
     
     # Check if vector store exists
     if os.path.exists(persist_directory):
         print("Loading existing vector store...")
-        embeddings = OpenAIEmbeddings()
-        vector_store = Chroma(
-            persist_directory=persist_directory,
-            embedding_function=embeddings
-        )
-        return vector_store
+        embeddings = get_embeddings()
+        return load_vector_store(persist_directory, embeddings, backend)
     
     print("Creating new vector store...")
     
@@ -26,19 +65,280 @@ def create_vector_store(persist_directory: str = "data/chroma_db"):
         raise ValueError("No documents found to process")
     
     # Create embeddings
-    embeddings = OpenAIEmbeddings()
+    embeddings = get_embeddings()
     
     # Create vector store
-    vector_store = Chroma.from_documents(
+    vector_store = build_vector_store(documents, embeddings, persist_directory, backend)
+    
+    # Build the keyword index from the same chunks
+    KeywordIndex.build(documents).save(index_path)
+    
+    # Extract statement line items for exact metric lookups
+    try:
+        build_statement_store()
+    except Exception as e:
+        print(f"Warning: Could not build statement store: {e}")
+    
+    # Record what was ingested so caches can tell when the index changes
+    write_manifest(documents, manifest_path)
+    
+    print(f"Vector store created with {len(documents)} document chunks")
+    return vector_store
+
+def build_vector_store(documents, embeddings, persist_directory: str, backend: str = None):
+    """Embed document chunks into a new vector store"""
+    if get_backend(backend) == "flat":
+        return FlatVectorIndex.build(documents, embeddings, persist_directory, dtype=os.getenv("RAG_FLAT_DTYPE", "int8"))
+    
+    return Chroma.from_documents(
         documents=documents,
         embedding=embeddings,
+        ids=[doc.metadata["chunk_id"] for doc in documents],
         persist_directory=persist_directory
     )
+
+def load_vector_store(persist_directory: str, embeddings, backend: str = None):
+    """Open an existing vector store"""
+    if get_backend(backend) == "flat":
+        return FlatVectorIndex.load(persist_directory, embeddings)
     
-    print(f"Vector store created with {len(documents)} document chunks")
-    return vector_store
+    return Chroma(
+        persist_directory=persist_directory,
+        embedding_function=embeddings
+    )
+
+def write_manifest(documents, manifest_path: str = "data/ingest_manifest.json", docs_path: str = "data/financial_docs/"):
+    """Write the ingestion manifest with a version hash of the ingested files"""
+    files = {}
+    for pdf_file in sorted(f for f in os.listdir(docs_path) if f.endswith('.pdf')):
+        stat = os.stat(os.path.join(docs_path, pdf_file))
+        files[pdf_file] = {"size": stat.st_size, "mtime": stat.st_mtime}
+    
+    # Embeddings from different backends are not comparable, so they version the index too
+    embeddings_backend = os.getenv("RAG_EMBEDDINGS", "openai").lower()
+    chunker = documents[0].metadata.get("chunker") if documents else None
+    version_source = {"files": files, "embeddings": embeddings_backend, "backend": get_backend(), "chunker": chunker}
+    version = hashlib.sha256(json.dumps(version_source, sort_keys=True).encode()).hexdigest()[:16]
+    manifest = {
+        "version": version,
+        "built_at": datetime.now().isoformat(),
+        "chunk_count": len(documents),
+        "embeddings": embeddings_backend,
+        "backend": get_backend(),
+        "chunker": chunker,
+        "files": files
+    }
+    
+    os.makedirs(os.path.dirname(manifest_path) or ".", exist_ok=True)
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def read_manifest_version(manifest_path: str = "data/ingest_manifest.json") -> str:
+    """Return the current ingestion version, or 'unversioned' for older stores"""
+    try:
+        with open(manifest_path) as f:
+            return json.load(f).get("version", "unversioned")
+    except (OSError, ValueError):
+        return "unversioned"
 
-def search_documents(query: str, vector_store, k: int = 3):
-    """Search for relevant documents"""
-    results = vector_store.similarity_search(query, k=k)
-    return results
\ No newline at end of file
+def read_manifest_chunker(manifest_path: str = "data/ingest_manifest.json"):
+    """Return the chunker version the current store was built with (None if unknown)"""
+    try:
+        with open(manifest_path) as f:
+            return json.load(f).get("chunker")
+    except (OSError, ValueError):
+        return None
+
+def load_keyword_index(vector_store, index_path: str = "data/keyword_index.json"):
+    """Load the keyword index, rebuilding it from the vector store if missing"""
+    if os.path.exists(index_path):
+        return KeywordIndex.load(index_path)
+    
+    print("Building keyword index from vector store...")
+    
+    # Reuse the stored chunks instead of re-parsing the PDFs
+    stored = vector_store.get(include=["documents", "metadatas"])
+    documents = [
+        Document(page_content=content, metadata=metadata or {})
+        for content, metadata in zip(stored["documents"], stored["metadatas"])
+    ]
+    
+    keyword_index = KeywordIndex.build(documents)
+    keyword_index.save(index_path)
+    return keyword_index
+
+def get_stored_vectors(vector_store, documents):
+    """Look up the stored embeddings of the given chunks (None if any is missing)"""
+    ids = [doc.metadata.get("chunk_id") for doc in documents]
+    if not all(ids):
+        return None
+    
+    if isinstance(vector_store, FlatVectorIndex):
+        return vector_store.vectors_for_ids(ids)
+    
+    stored = vector_store.get(ids=list(set(ids)), include=["embeddings"])
+    vectors_by_id = dict(zip(stored["ids"], stored["embeddings"]))
+    if len(vectors_by_id) < len(set(ids)):
+        return None
+    return np.asarray([vectors_by_id[chunk_id] for chunk_id in ids], dtype=np.float32)
+
+def max_marginal_relevance(relevance, vectors, k: int, lambda_mult: float = MMR_LAMBDA):
+    """Pick k rows, trading relevance against similarity to the rows already picked"""
+    similarity = vectors @ vectors.T
+    selected = []
+    remaining = list(range(len(vectors)))
+    
+    while remaining and len(selected) < k:
+        if selected:
+            redundancy = similarity[np.ix_(remaining, selected)].max(axis=1)
+        else:
+            redundancy = np.zeros(len(remaining))
+        mmr_scores = lambda_mult * relevance[remaining] - (1 - lambda_mult) * redundancy
+        selected.append(remaining.pop(int(np.argmax(mmr_scores))))
+    
+    return selected
+
+def mmr_rerank(documents, vector_store, k: int, lambda_mult: float = MMR_LAMBDA, query_embedding=None, relevance=None):
+    """
+    Re-rank candidates with maximal marginal relevance using the stored vectors.
+    
+    Overlapping chunks of the same page are near-duplicates, so this spreads
+    the top k over distinct facts. Relevance is the cosine to query_embedding
+    unless scores are passed in (e.g. fused ranks). No chunk is re-embedded.
+    """
+    if len(documents) <= 1:
+        return documents[:k]
+    
+    vectors = get_stored_vectors(vector_store, documents)
+    if vectors is None:
+        # Older stores without chunk ids: keep the original order
+        return documents[:k]
+    
+    vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    if relevance is None:
+        query = np.asarray(query_embedding, dtype=np.float32)
+        relevance = vectors @ (query / max(np.linalg.norm(query), 1e-12))
+    
+    selected = max_marginal_relevance(np.asarray(relevance, dtype=np.float32), vectors, k, lambda_mult)
+    return [documents[i] for i in selected]
+
+def _scaled(scores):
+    """Min-max scale scores to 0-1 so they are comparable with cosine similarity"""
+    scores = np.asarray(scores, dtype=np.float32)
+    spread = scores.max() - scores.min()
+    if not spread:
+        return np.ones(len(scores), dtype=np.float32)
+    return (scores - scores.min()) / spread
+
+def to_where(filters):
+    """Turn {"fiscal_year": "FY25", "quarter": "Q1"} into a Chroma where clause"""
+    if not filters:
+        return None
+    if len(filters) == 1:
+        return dict(filters)
+    return {"$and": [{key: value} for key, value in filters.items()]}
+
+def search_documents(query: str, vector_store, k: int = 3, fetch_k: int = 20, mmr: bool = True,
+                     query_embedding=None, filters=None):
+    """Search for relevant documents, re-ranked with MMR so near-duplicate chunks don't crowd the top k"""
+    if query_embedding is None:
+        with span("embed_query"):
+            query_embedding = vector_store.embeddings.embed_query(query)
+    with span("vector_search", k=k, filtered=bool(filters)):
+        results = vector_store.similarity_search_by_vector(query_embedding, k=max(k, fetch_k) if mmr else k,
+                                                           filter=to_where(filters))
+    
+    if not mmr:
+        return results
+    with span("mmr_rerank"):
+        return mmr_rerank(results, vector_store, k, query_embedding=query_embedding)
+
+def _doc_key(doc):
+    """Identify the same chunk across vector and keyword results"""
+    return doc.metadata.get("chunk_id") or doc.page_content
+
+def reciprocal_rank_fusion(result_lists, k: int = 3, rrf_k: int = 60, with_scores: bool = False):
+    """Merge ranked document lists with reciprocal-rank fusion"""
+    scores = {}
+    docs = {}
+    
+    for results in result_lists:
+        for rank, doc in enumerate(results):
+            key = _doc_key(doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank + 1)
+            docs.setdefault(key, doc)
+    
+    ranked = sorted(scores, key=scores.get, reverse=True)[:k]
+    if with_scores:
+        return [(docs[key], scores[key]) for key in ranked]
+    return [docs[key] for key in ranked]
+
+def is_exact_term_query(query: str, keyword_results) -> bool:
+    """Check whether the keyword results already answer the query verbatim"""
+    if not keyword_results:
+        return False
+    
+    # Quoted queries always ask for an exact phrase
+    phrase = query.strip()
+    if len(phrase) > 2 and phrase[0] == phrase[-1] and phrase[0] in "\"'":
+        return True
+    
+    # Short line-item style queries found word for word in the top hit
+    if len(phrase.split()) > 6:
+        return False
+    normalized_phrase = re.sub(r"\s+", " ", phrase.lower())
+    top_content = re.sub(r"\s+", " ", keyword_results[0][0].page_content.lower())
+    return normalized_phrase in top_content
+
+def hybrid_search(query: str, vector_store, keyword_index, k: int = 3, fetch_k: int = 20,
+                  query_embedding=None, filters=None):
+    """Search with BM25 and embeddings, fused with reciprocal-rank fusion"""
+    if filters:
+        # The keyword index has no filters, so over-fetch and keep the matching period
+        with span("keyword_search"):
+            keyword_results = keyword_index.search(query.strip("\"'"), k=fetch_k * 5)
+        keyword_results = [(doc, score) for doc, score in keyword_results if matches_filter(doc.metadata, filters)][:fetch_k]
+    else:
+        with span("keyword_search"):
+            keyword_results = keyword_index.search(query.strip("\"'"), k=fetch_k)
+    
+    # Exact-term lookups skip the embedding round trip entirely
+    if is_exact_term_query(query, keyword_results):
+        candidates = keyword_results[:fetch_k]
+    else:
+        vector_results = search_documents(query, vector_store, k=fetch_k, mmr=False,
+                                          query_embedding=query_embedding, filters=filters)
+        candidates = reciprocal_rank_fusion([[doc for doc, _ in keyword_results], vector_results], k=fetch_k, with_scores=True)
+    
+    if not candidates:
+        return []
+    
+    # MMR over the fused candidates, with their fused scores as relevance
+    documents = [doc for doc, _ in candidates]
+    return mmr_rerank(documents, vector_store, k, relevance=_scaled([score for _, score in candidates]))
+
+def multi_query_search(sub_queries, vector_store, keyword_index=None, k: int = 3, max_workers: int = 4):
+    """
+    Run several filtered searches at once (see rag.query_planner).
+    
+    All sub-queries are embedded in one batch, then searched concurrently.
+    Returns one result list per sub-query, in order.
+    """
+    if not sub_queries:
+        return []
+    
+    with span("embed_batch", queries=len(sub_queries)):
+        embeddings = vector_store.embeddings.embed_documents([sub["query"] for sub in sub_queries])
+    
+    def run(sub, embedding):
+        if keyword_index:
+            return hybrid_search(sub["query"], vector_store, keyword_index, k=k,
+                                 query_embedding=embedding, filters=sub.get("filters"))
+        return search_documents(sub["query"], vector_store, k=k, query_embedding=embedding, filters=sub.get("filters"))
+    
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(sub_queries))) as executor:
+        # Copy the context per search so their spans join the current trace
+        futures = [executor.submit(contextvars.copy_context().run, run, sub, embedding)
+                   for sub, embedding in zip(sub_queries, embeddings)]
+        return [future.result() for future in futures]
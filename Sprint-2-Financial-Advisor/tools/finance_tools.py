@@ -1,10 +1,24 @@
 import matplotlib.pyplot as plt
 import os
+import re
+import threading
 from datetime import datetime
 from typing import Optional
 from langchain.tools import tool
 import pandas as pd
 import yfinance as yf
+from tools.tracing import span
+
+# Tools may run concurrently, but pyplot keeps one global figure state
+plot_lock = threading.Lock()
+
+# Charts are saved under data/; the tools put the saved path in their result
+CHART_PATH = re.compile(r"data/[\w\-.]+\.png")
+
+def chart_path(tool_output: str) -> Optional[str]:
+    """The chart file named in a plot tool's result, if any"""
+    match = CHART_PATH.search(str(tool_output))
+    return match.group(0) if match else None
 
 @tool
 def create_hist_prices(start_date: str = '2020-01-01', end_date: Optional[str] = None):
@@ -37,7 +51,8 @@ def create_hist_prices(start_date: str = '2020-01-01', end_date: Optional[str] =
     
     # Download data
     try:
-        data = yf.download(sp500_tickers, start=start_date, end=end_date, progress=False)
+        with span("download"):
+            data = yf.download(sp500_tickers, start=start_date, end=end_date, progress=False)
         if data.empty:
             return "No data downloaded"
         
@@ -104,7 +119,8 @@ def plot_price_series(
     # Download data
     try:
         time.sleep(1)  # Rate limit protection
-        data = yf.download(ticker, start=start_date, end=end_date, interval=interval, progress=False, auto_adjust=False)
+        with span("download"):
+            data = yf.download(ticker, start=start_date, end=end_date, interval=interval, progress=False, auto_adjust=False)
         if data.empty:
             return f"No data found for {ticker}"
         
@@ -114,29 +130,30 @@ def plot_price_series(
     except Exception as e:
         return f"Error downloading data: {str(e)}"
     
-    # Create plot
-    try:
-        plt.figure(figsize=(12, 6))
-        plt.plot(data.index, data[field], linewidth=1.5)
-        plt.title(f"{ticker} {field}")
-        plt.xlabel("Date")
-        plt.ylabel("Price (USD)")
-        plt.grid(True, alpha=0.3)
-        plt.tight_layout()
-        
-        # Save plot
-        os.makedirs("static/plots", exist_ok=True)
-        timestamp = datetime.now().strftime("%H%M%S") 
-        filename = f"{ticker}_{field.replace(' ', '_')}_{timestamp}.png"
-        filepath = f"static/plots/{filename}"
-        plt.savefig(filepath)
-        plt.close()
-        
-        return f"Chart saved to {filepath}"
-        
-    except Exception as e:
-        plt.close()
-        return f"Error creating plot: {str(e)}"
+    # Create plot (pyplot is shared global state, so one chart at a time)
+    with plot_lock, span("render"):
+        try:
+            plt.figure(figsize=(12, 6))
+            plt.plot(data.index, data[field], linewidth=1.5)
+            plt.title(f"{ticker} {field}")
+            plt.xlabel("Date")
+            plt.ylabel("Price (USD)")
+            plt.grid(True, alpha=0.3)
+            plt.tight_layout()
+            
+            # Save plot
+            os.makedirs("static/plots", exist_ok=True)
+            timestamp = datetime.now().strftime("%H%M%S") 
+            filename = f"{ticker}_{field.replace(' ', '_')}_{timestamp}.png"
+            filepath = f"static/plots/{filename}"
+            plt.savefig(filepath)
+            plt.close()
+            
+            return f"Chart saved to {filepath}"
+            
+        except Exception as e:
+            plt.close()
+            return f"Error creating plot: {str(e)}"
     
     # ======================================================
     
@@ -180,7 +197,8 @@ def plot_price_from_local_data(
     
     # Load local data
     try:
-        df = pd.read_csv(csv_path, header=[0, 1], index_col=0, parse_dates=True)
+        with span("csv_load", path=csv_path):
+            df = pd.read_csv(csv_path, header=[0, 1], index_col=0, parse_dates=True)
         
         if (field, ticker) not in df.columns:
             available_tickers = df.columns.get_level_values(1).unique()[:10]
@@ -198,29 +216,30 @@ def plot_price_from_local_data(
     except Exception as e:
         return f"Error loading local data: {str(e)}"
     
-    # Create plot
-    try:
-        plt.figure(figsize=(12, 6))
-        plt.plot(series.index, series.values, linewidth=1.5)
-        plt.title(f"{ticker} {field}")
-        plt.xlabel("Date")
-        plt.ylabel("Price (USD)")
-        plt.grid(True, alpha=0.3)
-        plt.tight_layout()
-        
-        # Save plot with unique timestamp
-        os.makedirs("data", exist_ok=True)
-        timestamp = datetime.now().strftime("%H%M%S")
-        filename = f"{ticker}_{field.replace(' ', '_')}_{timestamp}.png"
-        filepath = f"data/{filename}"
-        plt.savefig(filepath)
-        plt.close()
-        
-        return f"Chart created successfully."
-        
-    except Exception as e:
-        plt.close()
-        return f"Error creating plot: {str(e)}"
+    # Create plot (pyplot is shared global state, so one chart at a time)
+    with plot_lock, span("render"):
+        try:
+            plt.figure(figsize=(12, 6))
+            plt.plot(series.index, series.values, linewidth=1.5)
+            plt.title(f"{ticker} {field}")
+            plt.xlabel("Date")
+            plt.ylabel("Price (USD)")
+            plt.grid(True, alpha=0.3)
+            plt.tight_layout()
+            
+            # Save plot with unique timestamp
+            os.makedirs("data", exist_ok=True)
+            timestamp = datetime.now().strftime("%H%M%S_%f")
+            filename = f"{ticker}_{field.replace(' ', '_')}_{timestamp}.png"
+            filepath = f"data/{filename}"
+            plt.savefig(filepath)
+            plt.close()
+            
+            return f"Chart created successfully: {filepath}"
+            
+        except Exception as e:
+            plt.close()
+            return f"Error creating plot: {str(e)}"
     
     
     # ===========================================
@@ -263,7 +282,8 @@ def plot_rolling_average(
     
     # Load local data
     try:
-        df = pd.read_csv(csv_path, header=[0, 1], index_col=0, parse_dates=True)
+        with span("csv_load", path=csv_path):
+            df = pd.read_csv(csv_path, header=[0, 1], index_col=0, parse_dates=True)
         
         if (field, ticker) not in df.columns:
             available_tickers = df.columns.get_level_values(1).unique()[:10]
@@ -291,31 +311,32 @@ def plot_rolling_average(
     except Exception as e:
         return f"Error calculating rolling average: {str(e)}"
     
-    # Create plot
-    try:
-        plt.figure(figsize=(12, 6))
-        plt.plot(series.index, series.values, linewidth=1, alpha=0.7, label=f'{ticker} {field}', color='#1f77b4')
-        plt.plot(rolling_avg.index, rolling_avg.values, linewidth=2, label=f'{window}-day Moving Average', color='#ff7f0e')
-        plt.title(f"{ticker} {field} with {window}-Day Rolling Average")
-        plt.xlabel("Date")
-        plt.ylabel("Price (USD)")
-        plt.legend()
-        plt.grid(True, alpha=0.3)
-        plt.tight_layout()
-        
-        # Save plot with unique timestamp
-        os.makedirs("data", exist_ok=True)
-        timestamp = datetime.now().strftime("%H%M%S")
-        filename = f"{ticker}_{field.replace(' ', '_')}_MA{window}_{timestamp}.png"
-        filepath = f"data/{filename}"
-        plt.savefig(filepath)
-        plt.close()
-        
-        return f"Rolling average chart created successfully."
-        
-    except Exception as e:
-        plt.close()
-        return f"Error creating plot: {str(e)}"
+    # Create plot (pyplot is shared global state, so one chart at a time)
+    with plot_lock, span("render"):
+        try:
+            plt.figure(figsize=(12, 6))
+            plt.plot(series.index, series.values, linewidth=1, alpha=0.7, label=f'{ticker} {field}', color='#1f77b4')
+            plt.plot(rolling_avg.index, rolling_avg.values, linewidth=2, label=f'{window}-day Moving Average', color='#ff7f0e')
+            plt.title(f"{ticker} {field} with {window}-Day Rolling Average")
+            plt.xlabel("Date")
+            plt.ylabel("Price (USD)")
+            plt.legend()
+            plt.grid(True, alpha=0.3)
+            plt.tight_layout()
+            
+            # Save plot with unique timestamp
+            os.makedirs("data", exist_ok=True)
+            timestamp = datetime.now().strftime("%H%M%S_%f")
+            filename = f"{ticker}_{field.replace(' ', '_')}_MA{window}_{timestamp}.png"
+            filepath = f"data/{filename}"
+            plt.savefig(filepath)
+            plt.close()
+            
+            return f"Rolling average chart created successfully: {filepath}"
+            
+        except Exception as e:
+            plt.close()
+            return f"Error creating plot: {str(e)}"
 
 
 @tool
@@ -356,7 +377,8 @@ def plot_volatility_histogram(
     
     # Load local data
     try:
-        df = pd.read_csv(csv_path, header=[0, 1], index_col=0, parse_dates=True)
+        with span("csv_load", path=csv_path):
+            df = pd.read_csv(csv_path, header=[0, 1], index_col=0, parse_dates=True)
         
         if (field, ticker) not in df.columns:
             available_tickers = df.columns.get_level_values(1).unique()[:10]
@@ -389,36 +411,37 @@ def plot_volatility_histogram(
     except Exception as e:
         return f"Error calculating volatility: {str(e)}"
     
-    # Create histogram plot
-    try:
-        plt.figure(figsize=(10, 6))
-        # Convert to percentage for display
-        volatility_pct = rolling_volatility * 100
-        
-        plt.hist(volatility_pct.values, bins=20, alpha=0.7, color='#1f77b4', edgecolor='black')
-        plt.title(f"{ticker} {window}-Day Rolling Volatility Distribution\n({start_date} to {end_date})")
-        plt.xlabel("Annualized Volatility (%)")
-        plt.ylabel("Frequency")
-        plt.grid(True, alpha=0.3)
-        
-        # Add statistics
-        mean_vol = volatility_pct.mean()
-        median_vol = volatility_pct.median()
-        plt.axvline(mean_vol, color='red', linestyle='--', label=f'Mean: {mean_vol:.2f}%')
-        plt.axvline(median_vol, color='orange', linestyle='--', label=f'Median: {median_vol:.2f}%')
-        plt.legend()
-        plt.tight_layout()
-        
-        # Save plot
-        os.makedirs("data", exist_ok=True)
-        timestamp = datetime.now().strftime("%H%M%S")
-        filename = f"{ticker}_volatility_hist_{window}d_{timestamp}.png"
-        filepath = f"data/{filename}"
-        plt.savefig(filepath)
-        plt.close()
-        
-        return f"Volatility histogram created successfully."
-        
-    except Exception as e:
-        plt.close()
-        return f"Error creating plot: {str(e)}"
\ No newline at end of file
+    # Create histogram plot (pyplot is shared global state, so one chart at a time)
+    with plot_lock, span("render"):
+        try:
+            plt.figure(figsize=(10, 6))
+            # Convert to percentage for display
+            volatility_pct = rolling_volatility * 100
+            
+            plt.hist(volatility_pct.values, bins=20, alpha=0.7, color='#1f77b4', edgecolor='black')
+            plt.title(f"{ticker} {window}-Day Rolling Volatility Distribution\n({start_date} to {end_date})")
+            plt.xlabel("Annualized Volatility (%)")
+            plt.ylabel("Frequency")
+            plt.grid(True, alpha=0.3)
+            
+            # Add statistics
+            mean_vol = volatility_pct.mean()
+            median_vol = volatility_pct.median()
+            plt.axvline(mean_vol, color='red', linestyle='--', label=f'Mean: {mean_vol:.2f}%')
+            plt.axvline(median_vol, color='orange', linestyle='--', label=f'Median: {median_vol:.2f}%')
+            plt.legend()
+            plt.tight_layout()
+            
+            # Save plot
+            os.makedirs("data", exist_ok=True)
+            timestamp = datetime.now().strftime("%H%M%S_%f")
+            filename = f"{ticker}_volatility_hist_{window}d_{timestamp}.png"
+            filepath = f"data/{filename}"
+            plt.savefig(filepath)
+            plt.close()
+            
+            return f"Volatility histogram created successfully: {filepath}"
+            
+        except Exception as e:
+            plt.close()
+            return f"Error creating plot: {str(e)}"
\ No newline at end of file
@@ -0,0 +1,144 @@
+import os
+import json
+import time
+import uuid
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+
+# One JSON line per traced turn; set FINBOT_TRACE_PATH="" to turn tracing off
+TRACE_PATH = os.getenv("FINBOT_TRACE_PATH", "data/traces.jsonl")
+
+_current_trace = contextvars.ContextVar("finbot_trace", default=None)
+_current_span = contextvars.ContextVar("finbot_span", default=None)
+_write_lock = threading.Lock()
+
+
+class Trace:
+    """Spans recorded during one FinBot turn"""
+    
+    def __init__(self, name: str, **attributes):
+        self.trace_id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.attributes = attributes
+        self.started_at = datetime.now().isoformat()
+        self.start = time.perf_counter()
+        self.duration_ms = None
+        self.spans = []
+        self.lock = threading.Lock()
+    
+    def offset_ms(self) -> float:
+        return round((time.perf_counter() - self.start) * 1000, 2)
+    
+    def add(self, span: dict):
+        with self.lock:
+            self.spans.append(span)
+    
+    def summary(self) -> dict:
+        """Time and tokens per span name, for the per-message breakdown"""
+        by_name = {}
+        with self.lock:
+            spans = list(self.spans)
+        for span in spans:
+            entry = by_name.setdefault(span["name"], {"count": 0, "duration_ms": 0.0, "input_tokens": 0, "output_tokens": 0})
+            entry["count"] += 1
+            entry["duration_ms"] = round(entry["duration_ms"] + span["duration_ms"], 2)
+            entry["input_tokens"] += span.get("input_tokens", 0)
+            entry["output_tokens"] += span.get("output_tokens", 0)
+        
+        return {
+            "trace_id": self.trace_id,
+            "duration_ms": self.duration_ms if self.duration_ms is not None else self.offset_ms(),
+            "input_tokens": sum(entry["input_tokens"] for entry in by_name.values()),
+            "output_tokens": sum(entry["output_tokens"] for entry in by_name.values()),
+            "spans": by_name
+        }
+    
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            **self.attributes,
+            "spans": self.spans
+        }
+
+
+def write_trace(trace: Trace, path: str = None):
+    path = TRACE_PATH if path is None else path
+    if not path:
+        return
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with _write_lock, open(path, "a") as f:
+            f.write(json.dumps(trace.to_dict(), default=str) + "\n")
+    except OSError as e:
+        print(f"Warning: Could not write trace: {e}")
+
+
+@contextmanager
+def trace(name: str, **attributes):
+    """Trace one turn; nested calls join the trace already running"""
+    existing = _current_trace.get()
+    if existing is not None:
+        yield existing
+        return
+    
+    new_trace = Trace(name, **attributes)
+    token = _current_trace.set(new_trace)
+    try:
+        yield new_trace
+    finally:
+        new_trace.duration_ms = new_trace.offset_ms()
+        _current_trace.reset(token)
+        write_trace(new_trace)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Time a block as a span of the current trace (no-op outside a trace).
+    
+    Yields the span dict so the block can add attributes such as token counts.
+    """
+    active_trace = _current_trace.get()
+    record = {"name": name, **attributes}
+    if active_trace is None:
+        yield record
+        return
+    
+    record.update({"span_id": uuid.uuid4().hex[:8], "parent_id": _current_span.get(), "start_ms": active_trace.offset_ms()})
+    token = _current_span.set(record["span_id"])
+    start = time.perf_counter()
+    try:
+        yield record
+    except Exception as e:
+        record["error"] = str(e)
+        raise
+    finally:
+        record["duration_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        _current_span.reset(token)
+        active_trace.add(record)
+
+
+def record_span(name: str, start: float, **attributes):
+    """Add a span timed by the caller (for generators, which can't hold a span across yields)"""
+    active_trace = _current_trace.get()
+    if active_trace is None:
+        return
+    active_trace.add({
+        "name": name,
+        "span_id": uuid.uuid4().hex[:8],
+        "parent_id": _current_span.get(),
+        "start_ms": round((start - active_trace.start) * 1000, 2),
+        "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+        **attributes
+    })
+
+
+def token_usage(message) -> dict:
+    """Input/output token counts reported on an LLM response, if any"""
+    usage = getattr(message, "usage_metadata", None) or {}
+    return {"input_tokens": usage.get("input_tokens", 0), "output_tokens": usage.get("output_tokens", 0)}
@@ -6,6 +6,10 @@ load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
 
+# Research: seconds allowed per search source, and for the whole research step
+RESEARCH_TIMEOUT = float(os.getenv("RESEARCH_TIMEOUT", "8"))
+RESEARCH_DEADLINE = float(os.getenv("RESEARCH_DEADLINE", "10"))
+
 MEDICAL_DISCLAIMER = """
 ⚠️ **EDUCATIONAL PURPOSES ONLY - NOT MEDICAL ADVICE**
 This information is for educational purposes only. Always consult with a qualified healthcare professional for medical concerns. In case of emergency, contact emergency services immediately.
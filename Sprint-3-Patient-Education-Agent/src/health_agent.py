@@ -3,7 +3,7 @@ from langgraph.checkpoint.memory import MemorySaver
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import SystemMessage, HumanMessage
 from schemas import HealthAgentState, UserInput
-from tools import search_wikipedia, search_tavily, combine_search_results
+from tools import run_research, combine_search_results
 from config import PERSONALITIES, HEALTH_PROMPT, MEDICAL_DISCLAIMER
 
 class HealthAgent:
@@ -36,9 +36,9 @@ class HealthAgent:
         user_input = state["user_input"]
         symptoms = user_input.symptoms
         
-        wikipedia_results = search_wikipedia(symptoms)
-        tavily_results = search_tavily(symptoms)
-        research_content = combine_search_results(wikipedia_results, tavily_results)
+        # Both sources at once, each with a timeout
+        results = run_research(symptoms)
+        research_content = combine_search_results(results.get("wikipedia", ""), results.get("tavily", ""))
         
         return {"research_content": research_content}
     
@@ -1,4 +1,8 @@
 import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from typing import Any, Dict
 try:
     from langchain_community.tools.tavily_search import TavilySearchResults
 except ImportError:
@@ -7,7 +11,11 @@ from langchain_community.document_loaders import WikipediaLoader
 from langchain_core.messages import SystemMessage
 from langchain_openai import ChatOpenAI
 from pydantic import BaseModel, Field
-from config import TAVILY_API_KEY
+from config import TAVILY_API_KEY, RESEARCH_TIMEOUT, RESEARCH_DEADLINE
+
+# The research cache module is shared with the Sprint 4 app
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "shared"))
+from research_cache import research_cache
 
 class SearchQuery(BaseModel):
     search_query: str = Field(description="Search query for retrieval")
@@ -59,6 +67,57 @@ def search_tavily(symptoms: str, max_results: int = 3) -> str:
     except Exception as e:
         return f"Error searching Tavily: {str(e)}"
 
+# Sources run_research queries by default
+RESEARCH_SOURCES = {
+    "wikipedia": search_wikipedia,
+    "tavily": search_tavily
+}
+
+_research_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="research")
+
+def run_research(query: str, sources: Dict[str, Any] = None, per_source_timeout: float = RESEARCH_TIMEOUT,
+                 deadline: float = RESEARCH_DEADLINE) -> Dict[str, str]:
+    """
+    Query all research sources at once and return {source: result} for the ones
+    that answered in time. A source gets at most `per_source_timeout` seconds and
+    the whole call returns within `deadline`, so research takes as long as the
+    slowest source (capped) rather than the sum. Results come from the shared
+    research cache when possible; failed searches are never cached.
+    
+    `sources` maps a name to a function taking the query (defaults to
+    Wikipedia and Tavily); pass stand-ins to test without the network.
+    """
+    sources = sources or RESEARCH_SOURCES
+    start = time.monotonic()
+    
+    results = {}
+    futures = {}
+    for name, search in sources.items():
+        cached = research_cache.get(name, query)
+        if cached is not None:
+            results[name] = cached
+        else:
+            futures[name] = _research_executor.submit(search, query)
+    
+    for name, future in futures.items():
+        elapsed = time.monotonic() - start
+        try:
+            results[name] = future.result(timeout=max(0, min(per_source_timeout, deadline) - elapsed))
+            if is_cacheable(results[name]):
+                research_cache.set(name, query, results[name])
+        except FuturesTimeoutError:
+            # The search keeps its thread until it returns, but nobody waits for it
+            future.cancel()
+            print(f"Warning: {name} research timed out")
+        except Exception as e:
+            print(f"Warning: {name} research failed: {e}")
+    
+    return results
+
+def is_cacheable(result: str) -> bool:
+    """Only real search results are cached, not errors or empty answers"""
+    return bool(result) and not result.startswith(("Error", "Tavily search unavailable"))
+
 def generate_search_query(symptoms: str, llm: ChatOpenAI) -> str:
     """Generate optimized search query from user symptoms"""
     try:
@@ -9,6 +9,10 @@ load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 TAVILY_API_KEY = os.getenv("TAVILY_API_KEY", "")
 
+# Research: seconds allowed per search source, and for the whole research step
+RESEARCH_TIMEOUT = float(os.getenv("RESEARCH_TIMEOUT", "8"))
+RESEARCH_DEADLINE = float(os.getenv("RESEARCH_DEADLINE", "10"))
+
 
 PERSONALITIES = {
     "concise": {
@@ -0,0 +1,85 @@
+"""
+Cross-validated evaluation of the local intent classifier.
+
+Reports, per confidence threshold, how many messages get a confident local
+HEALTH or NON_HEALTH decision, how many triage LLM calls that avoids (only a
+NON_HEALTH skips the call; a HEALTH still asks the LLM for urgency and route),
+how accurate the confident decisions are and how many health questions it
+would wrongly turn away.
+
+Usage: python evaluate_intent_classifier.py [--folds 5] [--threshold 0.9]
+"""
+import argparse
+import random
+from intent_classifier import IntentClassifier, classify_intent, load_examples, CONFIDENCE_THRESHOLD, NON_HEALTH_THRESHOLD
+
+
+def cross_validate(examples, folds: int = 5, threshold: float = CONFIDENCE_THRESHOLD,
+                   non_health_threshold: float = NON_HEALTH_THRESHOLD, seed: int = 42):
+    shuffled = examples[:]
+    random.Random(seed).shuffle(shuffled)
+    
+    confident = correct = 0
+    decided = {"HEALTH": 0, "NON_HEALTH": 0}
+    mistakes = []
+    for fold in range(folds):
+        test = shuffled[fold::folds]
+        train = [example for i, example in enumerate(shuffled) if i % folds != fold]
+        classifier = IntentClassifier(train)
+        
+        for example in test:
+            label, confidence, source = classify_intent(example["text"], threshold, classifier, non_health_threshold)
+            if label is None:
+                continue
+            confident += 1
+            decided[label] += 1
+            if label == example["label"]:
+                correct += 1
+            else:
+                mistakes.append((example["text"], example["label"], label, round(confidence, 3)))
+    
+    return {
+        "threshold": threshold,
+        "non_health_threshold": non_health_threshold,
+        "examples": len(examples),
+        "confident_health": decided["HEALTH"] / len(examples),
+        "confident_non_health": decided["NON_HEALTH"] / len(examples),
+        # Triage only skips its LLM call for a local NON_HEALTH
+        "llm_calls_avoided": decided["NON_HEALTH"] / len(examples),
+        "local_accuracy": correct / confident if confident else 0.0,
+        # If the LLM gets the uncertain ones right
+        "overall_accuracy": (correct + len(examples) - confident) / len(examples),
+        "health_rejected": sum(1 for mistake in mistakes if mistake[1] == "HEALTH"),
+        "mistakes": mistakes
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the local HEALTH/NON_HEALTH classifier")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=None, help="Only evaluate this HEALTH threshold")
+    parser.add_argument("--non-health-threshold", type=float, default=NON_HEALTH_THRESHOLD)
+    args = parser.parse_args()
+    
+    examples = load_examples()
+    thresholds = [args.threshold] if args.threshold else [0.6, 0.8, 0.9, 0.95, 0.99]
+    
+    print(f"{len(examples)} labelled examples, {args.folds}-fold cross-validation, "
+          f"NON_HEALTH threshold {args.non_health_threshold}\n")
+    print(f"{'threshold':>9}  {'local HEALTH':>12}  {'local NON_HEALTH':>16}  {'LLM calls avoided':>17}  "
+          f"{'local accuracy':>14}  {'overall accuracy':>16}  {'health rejected':>15}")
+    for threshold in thresholds:
+        report = cross_validate(examples, args.folds, threshold, args.non_health_threshold)
+        print(f"{threshold:>9}  {report['confident_health']:>12.1%}  {report['confident_non_health']:>16.1%}  "
+              f"{report['llm_calls_avoided']:>17.1%}  {report['local_accuracy']:>14.1%}  "
+              f"{report['overall_accuracy']:>16.1%}  {report['health_rejected']:>15}")
+    
+    report = cross_validate(examples, args.folds, args.threshold or CONFIDENCE_THRESHOLD, args.non_health_threshold)
+    if report["mistakes"]:
+        print(f"\nConfident mistakes at threshold {report['threshold']}:")
+        for text, expected, predicted, confidence in report["mistakes"]:
+            print(f"  {text!r}: expected {expected}, got {predicted} ({confidence})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""
+Regression check for the emergency lexicon.
+
+Runs every sentence in data/lexicon_cases.json through emergency_terms()
+and reports the ones whose emergency symptoms differ from the expected list.
+
+Usage: python evaluate_medical_lexicon.py
+"""
+import os
+import sys
+import json
+from medical_lexicon import emergency_terms
+
+CASES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "lexicon_cases.json")
+
+
+def main():
+    with open(CASES_PATH) as f:
+        cases = json.load(f)
+    
+    failures = []
+    for case in cases:
+        found = emergency_terms(case["text"])
+        if sorted(found) != sorted(case["emergency"]):
+            failures.append((case["text"], case["emergency"], found))
+    
+    print(f"{len(cases) - len(failures)}/{len(cases)} lexicon cases pass")
+    for text, expected, found in failures:
+        print(f"  {text!r}: expected {expected}, got {found}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,4 @@
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Literal
 from typing_extensions import TypedDict
 from pydantic import BaseModel, Field
 from datetime import datetime
@@ -16,6 +16,44 @@ class UserInput(BaseModel):
     current_medications: Optional[List[str]] = Field(default=[], description="Current medications")
     allergies: Optional[List[str]] = Field(default=[], description="Known allergies")
 
+#=============================================================================
+# EXTRACTION MODELS
+#=============================================================================
+
+class ExtractedLifestyle(BaseModel):
+    smoking: Optional[str] = Field(default=None, description="yes, no or former")
+    alcohol: Optional[str] = Field(default=None, description="Drinking frequency")
+    exercise: Optional[str] = Field(default=None, description="Exercise frequency")
+
+class ExtractedProfile(BaseModel):
+    """Patient facts stated in one message - used for both validation and the patient context"""
+    name: Optional[str] = Field(default=None, description="Patient's name")
+    age: Optional[int] = Field(default=None, description="Age in years")
+    gender: Optional[str] = Field(default=None, description="male or female")
+    height: Optional[str] = Field(default=None, description="Height as written, e.g. 6'1\" or 185cm")
+    weight: Optional[float] = Field(default=None, description="Weight as a number")
+    weight_unit: Optional[str] = Field(default=None, description="lbs or kg")
+    conditions: List[str] = Field(default_factory=list, description="Diagnosed conditions")
+    medications: List[str] = Field(default_factory=list, description="Current medications")
+    allergies: List[str] = Field(default_factory=list, description="Known allergies")
+    family_history: List[str] = Field(default_factory=list, description="Conditions in the family")
+    lab_values: Dict[str, float] = Field(default_factory=dict, description="Lab test name to numeric value")
+    lifestyle: ExtractedLifestyle = Field(default_factory=ExtractedLifestyle, description="Smoking, alcohol, exercise")
+
+class DietAdvice(BaseModel):
+    """Diet agent's LLM output"""
+    dietary_restrictions: List[str] = Field(default_factory=list, description="Restrictions that apply to this patient")
+    recommended_foods: List[str] = Field(default_factory=list, description="Foods to eat more of")
+    foods_to_avoid: List[str] = Field(default_factory=list, description="Foods to limit or avoid")
+    meal_suggestions: List[str] = Field(default_factory=list, description="Short, practical meal ideas")
+    supplements: List[str] = Field(default_factory=list, description="Supplements worth discussing with a doctor")
+
+class TreatmentAdvice(BaseModel):
+    """Treatment agent's LLM output"""
+    care_recommendations: List[str] = Field(default_factory=list, description="Practical self-care steps")
+    lifestyle_changes: List[str] = Field(default_factory=list, description="Lifestyle changes that help")
+    when_to_see_doctor: str = Field(default="", description="Signs or timeframe for seeing a doctor")
+
 #=============================================================================
 # PATIENT CONTEXT MODELS - FIXED
 #=============================================================================
@@ -57,6 +95,14 @@ class TriageResult(BaseModel):
     routing_decision: str
     confidence_score: float
 
+class TriageDecision(BaseModel):
+    """Triage LLM output - intent, urgency and route in one call"""
+    intent: Literal["HEALTH", "NON_HEALTH"] = Field(description="Whether the query is health-related")
+    urgency: Literal["LOW", "MEDIUM", "HIGH"] = Field(description="How soon the patient needs care")
+    route: Literal["diet_only", "treatment_only", "diagnosis_only", "full_pipeline", "clarification"] = Field(
+        description="Which specialist agents the query needs"
+    )
+
 class DiagnosisResult(BaseModel):
     symptoms: List[str]
     symptom_analysis: Dict[str, Any]
@@ -113,6 +159,14 @@ class MultiAgentHealthState(TypedDict):
     # Patient Context - NEW
     patient_context: Optional[PatientContext]
     conversation_summary: Optional[ConversationSummary]
+    extracted_profile: Optional[ExtractedProfile]
+    
+    # Validation (nodes can only pass on keys declared here)
+    validation_error: bool
+    validation_errors: List[str]
+    validation_warnings: List[str]
+    emergency_override: bool
+    emergency_message: str
     
     # Agent Results
     triage_result: Optional[TriageResult]
@@ -1,11 +1,19 @@
 import os
+import sys
 import json
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 from langchain_core.tools import tool
 from pydantic import BaseModel, Field
-from config import TAVILY_API_KEY
+from config import TAVILY_API_KEY, RESEARCH_TIMEOUT, RESEARCH_DEADLINE
+
+# The research cache module is shared with the Sprint 3 app
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared"))
+from research_cache import research_cache
+from medical_lexicon import find_medical_terms
 
 try:
     from langchain_community.tools.tavily_search import TavilySearchResults
@@ -61,6 +69,61 @@ def search_tavily(query: str, max_results: int = 3) -> str:
     except Exception as e:
         return f"Error searching Tavily: {str(e)}"
 
+# Sources run_research queries by default
+RESEARCH_SOURCES = {
+    "wikipedia": lambda query: search_wikipedia.invoke({"query": query}),
+    "tavily": lambda query: search_tavily.invoke({"query": query})
+}
+
+#=============================================================================
+# CONCURRENT RESEARCH
+#=============================================================================
+
+_research_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="research")
+
+def run_research(query: str, sources: Dict[str, Any] = None, per_source_timeout: float = RESEARCH_TIMEOUT,
+                 deadline: float = RESEARCH_DEADLINE) -> Dict[str, str]:
+    """
+    Query all research sources at once and return {source: result} for the ones
+    that answered in time. A source gets at most `per_source_timeout` seconds and
+    the whole call returns within `deadline`, so research takes as long as the
+    slowest source (capped) rather than the sum. Results come from the shared
+    research cache when possible; failed searches are never cached.
+    
+    `sources` maps a name to a function taking the query (defaults to
+    Wikipedia and Tavily); pass stand-ins to test without the network.
+    """
+    sources = sources or RESEARCH_SOURCES
+    start = time.monotonic()
+    
+    results = {}
+    futures = {}
+    for name, search in sources.items():
+        cached = research_cache.get(name, query)
+        if cached is not None:
+            results[name] = cached
+        else:
+            futures[name] = _research_executor.submit(search, query)
+    
+    for name, future in futures.items():
+        elapsed = time.monotonic() - start
+        try:
+            results[name] = future.result(timeout=max(0, min(per_source_timeout, deadline) - elapsed))
+            if is_cacheable(results[name]):
+                research_cache.set(name, query, results[name])
+        except FuturesTimeoutError:
+            # The search keeps its thread until it returns, but nobody waits for it
+            future.cancel()
+            print(f"Warning: {name} research timed out")
+        except Exception as e:
+            print(f"Warning: {name} research failed: {e}")
+    
+    return results
+
+def is_cacheable(result: str) -> bool:
+    """Only real search results are cached, not errors or empty answers"""
+    return bool(result) and not result.startswith(("Error", "Tavily search unavailable"))
+
 #=============================================================================
 # SIMPLE CALCULATION TOOLS (KEEP THESE)
 #=============================================================================
@@ -139,28 +202,9 @@ def calculate_nutrition_needs(condition: str, age: int, gender: str, activity_le
 def score_symptom_severity(symptoms: List[str], age: int = None) -> Dict[str, any]:
     """Score symptom severity based on common medical criteria"""
     try:
-        emergency_keywords = [
-            "chest pain", "difficulty breathing", "severe bleeding", 
-            "unconscious", "seizure", "stroke", "heart attack"
-        ]
-        
-        high_severity = [
-            "fever over 101", "persistent vomiting", "severe headache",
-            "confusion", "rapid heartbeat", "shortness of breath"
-        ]
-        
-        symptom_text = " ".join(symptoms).lower()
-        score = 0
-        
-        # Check for emergency symptoms
-        for keyword in emergency_keywords:
-            if keyword in symptom_text:
-                score += 10
-        
-        # Check for high severity symptoms
-        for keyword in high_severity:
-            if keyword in symptom_text:
-                score += 5
+        # Emergency symptoms score 10, high severity ones 5 (medical_lexicon)
+        matches = find_medical_terms(" . ".join(symptoms))
+        score = sum(match["weight"] for match in matches)
         
         # Age factor
         if age and (age > 65 or age < 5):
@@ -178,7 +222,8 @@ def score_symptom_severity(symptoms: List[str], age: int = None) -> Dict[str, an
         
         return {
             "severity_score": score,
-            "severity_level": level
+            "severity_level": level,
+            "matched_symptoms": [match["term"] for match in matches]
         }
         
     except Exception as e:
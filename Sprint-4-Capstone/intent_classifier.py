@@ -0,0 +1,141 @@
+import os
+import re
+import json
+import math
+from collections import Counter
+from typing import List, Optional, Tuple
+from medical_lexicon import find_medical_terms
+
+
+EXAMPLES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "intent_examples.json")
+
+# Below this probability the classifier is unsure and triage asks the LLM.
+# Turning away a real health question is worse, so NON_HEALTH needs more confidence.
+CONFIDENCE_THRESHOLD = 0.95
+NON_HEALTH_THRESHOLD = 0.98
+
+# Multi-word health phrases that mark a message as health-related on their own.
+# Single words ("cold", "sugar", "period", "stress") are left to the model, since
+# they show up in plenty of off-topic questions.
+HEALTH_PHRASES = {
+    "blood pressure", "blood sugar", "blood test", "blood work", "heart rate", "side effects",
+    "sore throat", "runny nose", "stomach ache", "back pain", "joint pain", "muscle pain",
+    "lose weight", "weight loss", "gain weight", "lab results", "test results", "a1c level",
+    "high cholesterol", "ldl cholesterol", "type 2 diabetes", "type 1 diabetes", "mental health",
+    "healthy diet", "healthy eating", "trouble sleeping", "can't sleep", "panic attack",
+    "allergic reaction", "skin rash", "see a doctor", "my doctor", "vitamin d", "iron deficiency",
+    "high blood", "low blood", "feel sick", "feeling sick", "feel dizzy", "feeling dizzy"
+}
+
+# Health-sounding words. Too ambiguous to decide HEALTH ("cold brew", "burn a CD"),
+# but enough that a NON_HEALTH guess from the model goes to the LLM instead
+HEALTH_WORDS = {
+    "pain", "ache", "hurts", "sore", "fever", "cough", "cold", "flu", "infection", "rash", "swollen",
+    "dizzy", "nausea", "vomiting", "diarrhea", "constipation", "bloating", "headache", "migraine",
+    "tired", "fatigue", "insomnia", "sleep", "anxiety", "depression", "stress", "diet", "nutrition",
+    "calories", "protein", "vitamin", "vitamins", "supplement", "fiber", "weight", "bmi", "exercise",
+    "doctor", "symptoms", "diagnosis", "treatment", "medication", "medicine", "pill", "dose",
+    "blood", "pressure", "cholesterol", "ldl", "hdl", "triglycerides", "glucose", "sugar", "a1c", "insulin",
+    "diabetes", "prediabetic", "asthma", "allergy", "allergic", "arthritis", "cancer", "thyroid", "kidney",
+    "liver", "heart", "lungs", "stomach", "skin", "joint", "joints", "muscle", "bone", "injury", "sprained",
+    "burn", "wound", "pregnancy", "period", "menopause", "smoking", "alcohol", "metformin", "ibuprofen",
+    "antibiotics", "lab", "healthy", "health"
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Words plus word pairs ("blood pressure" means more than "blood" and "pressure")"""
+    words = re.findall(r"[a-z0-9']+", text.lower().replace("’", "'"))
+    return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+
+class IntentClassifier:
+    """
+    Multinomial Naive Bayes over words and word pairs, trained on the bundled
+    labelled examples (HEALTH / NON_HEALTH). Small enough to train at import
+    and classify in microseconds.
+    """
+    
+    def __init__(self, examples: List[dict]):
+        self.labels = sorted({example["label"] for example in examples})
+        self.word_counts = {label: Counter() for label in self.labels}
+        self.example_counts = Counter(example["label"] for example in examples)
+        
+        for example in examples:
+            self.word_counts[example["label"]].update(tokenize(example["text"]))
+        
+        self.vocabulary = set().union(*self.word_counts.values())
+        self.totals = {label: sum(counts.values()) for label, counts in self.word_counts.items()}
+    
+    def probabilities(self, text: str) -> dict:
+        """Posterior probability of each label"""
+        tokens = [token for token in tokenize(text) if token in self.vocabulary]
+        log_scores = {}
+        for label in self.labels:
+            score = math.log(self.example_counts[label] / sum(self.example_counts.values()))
+            for token in tokens:
+                # Laplace smoothing
+                score += math.log((self.word_counts[label][token] + 1) / (self.totals[label] + len(self.vocabulary)))
+            log_scores[label] = score
+        
+        # Normalise in log space to avoid underflow
+        best = max(log_scores.values())
+        exp_scores = {label: math.exp(score - best) for label, score in log_scores.items()}
+        total = sum(exp_scores.values())
+        return {label: score / total for label, score in exp_scores.items()}
+    
+    def predict(self, text: str) -> Tuple[str, float]:
+        probabilities = self.probabilities(text)
+        label = max(probabilities, key=probabilities.get)
+        return label, probabilities[label]
+
+
+def load_examples(path: str = EXAMPLES_PATH) -> List[dict]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def _load_classifier() -> Optional[IntentClassifier]:
+    try:
+        return IntentClassifier(load_examples())
+    except (OSError, ValueError) as e:
+        print(f"Intent classifier unavailable, using the LLM: {e}")
+        return None
+
+
+# Trained once at import
+INTENT_CLASSIFIER = _load_classifier()
+
+
+def health_phrases(text: str) -> List[str]:
+    """HEALTH_PHRASES found in the text, as whole words"""
+    words = re.findall(r"[a-z0-9']+", text.lower().replace("’", "'"))
+    padded = f" {' '.join(words)} "
+    return [phrase for phrase in HEALTH_PHRASES if f" {phrase} " in padded]
+
+
+def classify_intent(text: str, threshold: float = CONFIDENCE_THRESHOLD, classifier: IntentClassifier = None,
+                    non_health_threshold: float = NON_HEALTH_THRESHOLD) -> Tuple[Optional[str], float, str]:
+    """
+    (label, confidence, source): HEALTH or NON_HEALTH, or None when the local
+    checks are unsure and the LLM should decide. source says which check
+    decided: "lexicon" (a symptom), "phrase" (a HEALTH_PHRASES match) or "model".
+    """
+    classifier = classifier or INTENT_CLASSIFIER
+    
+    # A symptom from the medical lexicon settles it
+    if find_medical_terms(text):
+        return "HEALTH", 1.0, "lexicon"
+    # A health phrase is a strong hint, but triage lets the LLM overrule it
+    if health_phrases(text):
+        return "HEALTH", 1.0, "phrase"
+    if classifier is None:
+        return None, 0.0, "model"
+    
+    label, confidence = classifier.predict(text)
+    if confidence < (non_health_threshold if label == "NON_HEALTH" else threshold):
+        return None, confidence, "model"
+    # Never turn a question away locally if it mentions a health word
+    if label == "NON_HEALTH" and HEALTH_WORDS.intersection(tokenize(text)):
+        return None, confidence, "model"
+    return label, confidence, "model"
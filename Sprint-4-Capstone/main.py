@@ -5,6 +5,7 @@ from datetime import datetime
 from multi_agent_health_system import MultiAgentHealthSystem
 from extended_schemas import UserInput, PatientContext
 from config import PERSONALITIES,  MEDICAL_DISCLAIMER 
+from extended_tools import research_cache
 
 st.set_page_config(
     page_title="HealthBot - AI Patient Education",
@@ -80,6 +81,12 @@ def main():
         else:
             st.info("📋 No profile yet")
         
+        # Research cache shared across sessions
+        cache_stats = research_cache.get_stats()
+        st.caption(f"📚 Research cache: {cache_stats['entries']} entries · "
+                   f"{cache_stats['hits']} hits / {cache_stats['misses']} misses "
+                   f"({cache_stats['hit_rate']:.0%} hit rate)")
+        
         # Session management
         st.subheader("💭 Session")
         
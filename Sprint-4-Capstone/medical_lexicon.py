@@ -0,0 +1,178 @@
+import re
+from collections import deque
+from typing import Dict, List
+
+
+#=============================================================================
+# LEXICON
+#=============================================================================
+
+# Canonical term -> (category, weight, synonyms)
+MEDICAL_TERMS = {
+    # Emergency symptoms - always routed to the emergency handler. Only the original
+    # triage keywords and phrases that mean the same thing clinically belong here.
+    "chest pain": ("emergency", 10, ["chest pains", "pain in my chest", "pain in the chest"]),
+    "vomiting blood": ("emergency", 10, ["throwing up blood", "vomited blood"]),
+    "black tarry stools": ("emergency", 10, ["tarry stools"]),
+    "difficulty breathing": ("emergency", 10, ["trouble breathing", "hard to breathe", "struggling to breathe"]),
+    "shortness of breath": ("emergency", 10, ["short of breath"]),
+    "can't breathe": ("emergency", 10, ["cannot breathe", "can not breathe", "cant breathe"]),
+    "confusion": ("emergency", 10, []),
+    "fever 103": ("emergency", 10, ["fever over", "fever of 103", "fever of 104"]),
+    "unconscious": ("emergency", 10, ["unresponsive"]),
+    "seizure": ("emergency", 10, ["seizures", "convulsions"]),
+    "stroke": ("emergency", 10, ["face drooping", "slurred speech"]),
+    "heart attack": ("emergency", 10, ["myocardial infarction"]),
+    "severe bleeding": ("emergency", 10, []),
+    "severe pain": ("emergency", 10, ["excruciating pain", "unbearable pain"]),
+    "radiating pain": ("emergency", 10, ["pain radiating"]),
+    "left arm pain": ("emergency", 10, ["pain in my left arm", "pain in the left arm"]),
+    
+    # High severity symptoms - raise the severity score. Looser phrases live here
+    # ("confused about what to eat", "heavy bleeding during my period").
+    "persistent vomiting": ("high", 5, ["can't stop vomiting", "keep vomiting"]),
+    "severe headache": ("high", 5, ["worst headache", "splitting headache"]),
+    "rapid heartbeat": ("high", 5, ["racing heart", "heart racing", "heart is racing", "palpitations"]),
+    "fever": ("high", 5, ["feverish", "high fever", "temperature of 101"]),
+    "confused": ("high", 5, ["disoriented"]),
+    "heavy bleeding": ("high", 5, ["bleeding heavily"]),
+    "black stools": ("high", 5, []),
+    "fainting": ("high", 5, ["fainted", "passed out"]),
+}
+
+# Words that negate a symptom mentioned shortly after them ("no chest pain")
+NEGATION_WORDS = {
+    "no", "not", "without", "denies", "deny", "denied", "never", "none", "nor",
+    "don't", "dont", "doesn't", "didn't", "haven't", "hasn't", "isn't", "wasn't"
+}
+
+# Look like negations but aren't ("not sure if it's chest pain")
+PSEUDO_NEGATIONS = ["not sure", "not certain", "not only", "no idea", "don't know", "dont know", "do not know", "not know"]
+
+# A negation reaches at most this many words forward, and never past a clause break.
+# "and"/"or" end it too: in "no appetite and chest pain" only the appetite is negated.
+NEGATION_WINDOW = 5
+CLAUSE_BREAK = re.compile(r"[.;:!?,]|\b(?:but|however|although|except|and|or|with|then)\b")
+
+# ...except between two symptoms: in "denies chest pain and shortness of breath" the
+# second symptom is negated along with the first. Anything else between them
+# ("no chest pain and I have shortness of breath") keeps the second one.
+SYMPTOM_LIST_JOIN = re.compile(r"\s*,?\s*(?:and|or|nor)\s+")
+
+
+def normalize(text: str) -> str:
+    """Lower-case, straighten apostrophes and collapse whitespace"""
+    text = text.lower().replace("’", "'")
+    return re.sub(r"\s+", " ", text)
+
+
+#=============================================================================
+# AHO-CORASICK MATCHER
+#=============================================================================
+
+class LexiconMatcher:
+    """
+    Finds every lexicon phrase in a text in one pass (Aho-Corasick automaton),
+    so matching cost grows with the text, not with the number of terms.
+    """
+    
+    def __init__(self, terms: Dict[str, tuple]):
+        self.goto = [{}]
+        self.fail = [0]
+        self.outputs = [[]]
+        
+        for canonical, (category, weight, synonyms) in terms.items():
+            entry = {"term": canonical, "category": category, "weight": weight}
+            for phrase in [canonical] + synonyms:
+                self._add(normalize(phrase), entry)
+        self._build_fail_links()
+    
+    def _add(self, phrase: str, entry: dict):
+        node = 0
+        for char in phrase:
+            if char not in self.goto[node]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.outputs.append([])
+                self.goto[node][char] = len(self.goto) - 1
+            node = self.goto[node][char]
+        self.outputs[node].append((len(phrase), entry))
+    
+    def _build_fail_links(self):
+        """Breadth-first: each node falls back to the longest suffix that is also a prefix"""
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.outputs[child] = self.outputs[child] + self.outputs[self.fail[child]]
+    
+    def find(self, text: str, include_negated: bool = False) -> List[dict]:
+        """
+        All lexicon matches in the text, as dicts with term, category, weight,
+        matched text, start and end positions and whether the mention is negated.
+        """
+        text = normalize(text)
+        found = []
+        node = 0
+        
+        for end, char in enumerate(text, start=1):
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            
+            for length, entry in self.outputs[node]:
+                start = end - length
+                # Whole words only ("stroke" should not match "heatstroke")
+                if start > 0 and text[start - 1].isalnum():
+                    continue
+                if end < len(text) and text[end].isalnum():
+                    continue
+                found.append((start, end, entry))
+        
+        matches = []
+        for start, end, entry in sorted(found, key=lambda item: (item[0], -item[1])):
+            negated = is_negated(text, start)
+            
+            # A symptom listed right after a negated one shares its negation
+            earlier = [match for match in matches if match["end"] <= start]
+            if not negated and earlier:
+                previous = max(earlier, key=lambda match: match["end"])
+                negated = previous["negated"] and bool(SYMPTOM_LIST_JOIN.fullmatch(text[previous["end"]:start]))
+            
+            matches.append({**entry, "text": text[start:end], "start": start, "end": end, "negated": negated})
+        
+        return [match for match in matches if include_negated or not match["negated"]]
+
+
+def is_negated(text: str, start: int) -> bool:
+    """Whether a negation word precedes position `start` within the same clause"""
+    clause = CLAUSE_BREAK.split(text[:start])[-1]
+    if any(pseudo in clause for pseudo in PSEUDO_NEGATIONS):
+        return False
+    words = re.findall(r"[a-z']+", clause)[-NEGATION_WINDOW:]
+    return any(word in NEGATION_WORDS for word in words)
+
+
+# Compiled once at import
+MEDICAL_LEXICON = LexiconMatcher(MEDICAL_TERMS)
+
+
+def find_medical_terms(text: str) -> List[dict]:
+    """Non-negated symptom mentions in the text, one per canonical term"""
+    seen = set()
+    unique = []
+    for match in MEDICAL_LEXICON.find(text):
+        if match["term"] not in seen:
+            seen.add(match["term"])
+            unique.append(match)
+    return unique
+
+
+def emergency_terms(text: str) -> List[str]:
+    """Canonical emergency symptoms mentioned (and not negated) in the text"""
+    return [match["term"] for match in find_medical_terms(text) if match["category"] == "emergency"]
@@ -20,17 +20,22 @@ from langchain_core.messages import SystemMessage, HumanMessage
 from extended_schemas import (
     MultiAgentHealthState, UserInput, PatientContext, ConversationSummary,
     TriageResult, DiagnosisResult, DietResult, TreatmentResult, 
-    SynthesisResult, HallucinationCheck, 
+    SynthesisResult, HallucinationCheck, ExtractedProfile, DietAdvice, 
+    TreatmentAdvice, TriageDecision, 
 )
 from extended_tools import (
     search_wikipedia, search_tavily, calculate_bmi, calculate_nutrition_needs, 
     score_symptom_severity, schedule_appointment, validate_medical_safety, 
-    combine_search_results, 
+    combine_search_results, run_research, 
 )
 from config import PERSONALITIES, MEDICAL_DISCLAIMER
+from medical_lexicon import emergency_terms, find_medical_terms
+from intent_classifier import classify_intent
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 import re
 import json
+import threading
 
 
 class HealthDataValidator:
@@ -86,14 +91,7 @@ class HealthDataValidator:
     @staticmethod
     def validate_emergency_consistency(symptoms: str, query_intent: str = "") -> dict:
         """Ensure emergency cases aren't treated as routine"""
-        emergency_keywords = [
-            "chest pain", "vomiting blood", "black tarry stools", 
-            "difficulty breathing", "shortness of breath", "confusion", 
-            "fever", "severe pain", "unconscious", "seizure", "stroke",
-            "heart attack", "can't breathe", "severe bleeding"
-        ]
-        
-        has_emergency = any(keyword in symptoms.lower() for keyword in emergency_keywords)
+        has_emergency = bool(emergency_terms(symptoms))
         
         routine_intents = ["metadata", "summary", "diet recommendations", "lifestyle advice"]
         is_routine_query = any(intent in query_intent.lower() for intent in routine_intents)
@@ -159,11 +157,22 @@ class MultiAgentHealthSystem:
             frequency_penalty=self.openai_settings.get("frequency_penalty", 0.0),
             max_tokens=self.openai_settings.get("max_tokens", 1000)
         )
+        # Schema-bound extraction of the patient profile (function calling)
+        self.extractor = self.llm.with_structured_output(ExtractedProfile, method="function_calling")
+        self.triage_llm = self.llm.with_structured_output(TriageDecision, method="function_calling")
+        # Diet and treatment advice come back as fields synthesis can use
+        self.diet_llm = self.llm.with_structured_output(DietAdvice, method="function_calling")
+        self.treatment_llm = self.llm.with_structured_output(TreatmentAdvice, method="function_calling")
         
         self.memory = MemorySaver()
         self.graph = self._build_graph()
         self.conversation_history = []
         self.validator = HealthDataValidator()
+        # Profile extraction left running after an emergency response
+        self.pending_profile_update = None
+        # Research started speculatively at request start: (query, future)
+        self.research_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="research")
+        self.research_prefetch = None
         # Initialize with empty patient context
         self.patient_context = PatientContext(
             user_id="default",
@@ -209,36 +218,24 @@ class MultiAgentHealthSystem:
         builder.add_edge("validation_error_handler", END)
         builder.add_edge("profile_extractor", "triage_agent")
         
-        # Conditional routing from triage
+        # Conditional routing from triage (full_pipeline fans out to several agents)
         builder.add_conditional_edges(
             "triage_agent",
             self._route_decision,
-            {
-                "emergency": "emergency_handler",
-                "diagnosis_only": "diagnosis_agent",
-                "diet_only": "diet_agent",
-                "treatment_only": "treatment_agent",
-                "full_pipeline": "diagnosis_agent",
-                "clarification": "synthesis_agent",
-                "non_health_rejection": "non_health_rejection"
-            }
+            [
+                "emergency_handler", "diagnosis_agent", "diet_agent", "treatment_agent",
+                "synthesis_agent", "non_health_rejection"
+            ]
         )
         
         # Emergency and non-health bypass normal pipeline
         builder.add_edge("emergency_handler", END)
         builder.add_edge("non_health_rejection", END)
         
-        # Normal pipeline routes
-        builder.add_conditional_edges(
-            "diagnosis_agent",
-            lambda x: "synthesis_agent" if x.get("triage_result", {}).routing_decision == "diagnosis_only" else "diet_agent"
-        )
-        
-        builder.add_conditional_edges(
-            "diet_agent",
-            lambda x: "synthesis_agent" if x.get("triage_result", {}).routing_decision in ["diet_only", "diagnosis_only"] else "treatment_agent"
-        )
-        
+        # Specialist agents don't depend on each other, so they all join at synthesis
+        # (synthesis waits for every agent started in the same step)
+        builder.add_edge("diagnosis_agent", "synthesis_agent")
+        builder.add_edge("diet_agent", "synthesis_agent")
         builder.add_edge("treatment_agent", "synthesis_agent")
         builder.add_edge("synthesis_agent", "hallucination_detector")
         builder.add_edge("hallucination_detector", END)
@@ -249,53 +246,57 @@ class MultiAgentHealthSystem:
         """Route based on validation results"""
         return "invalid" if state.get("validation_error") else "valid"
     
+    # Nodes to run for each triage decision; several nodes run concurrently
+    ROUTE_NODES = {
+        "emergency": ["emergency_handler"],
+        "diagnosis_only": ["diagnosis_agent"],
+        "diet_only": ["diet_agent"],
+        "treatment_only": ["treatment_agent"],
+        "full_pipeline": ["diagnosis_agent", "diet_agent", "treatment_agent"],
+        "clarification": ["synthesis_agent"],
+        "non_health_rejection": ["non_health_rejection"]
+    }
+    
     def _route_decision(self, state: MultiAgentHealthState):
-        """Determine which route to take based on triage results"""
+        """Determine which nodes to run based on triage results"""
         triage_result = state.get("triage_result", {})
-        return triage_result.routing_decision
+        return self._route_nodes(triage_result.routing_decision)
+    
+    def _route_nodes(self, routing: str) -> list:
+        """Nodes for a triage decision; research prefetch is dropped if no diagnosis will run"""
+        nodes = self.ROUTE_NODES.get(routing, self.ROUTE_NODES["full_pipeline"])
+        if "diagnosis_agent" not in nodes:
+            self._drop_research_prefetch()
+        return nodes
     
     #=========================================================================
     # NEW: DATA VALIDATOR
     #=========================================================================
     
     def _data_validator(self, state: MultiAgentHealthState):
-        """Validate input data for biological plausibility"""
+        """Extract the patient profile once and validate it for biological plausibility"""
         user_input = state["user_input"]
         
-        # Extract basic demographics for validation
-        prompt = f"""Extract demographic data from this text for validation. Return ONLY a JSON object:
+        # One structured extraction feeds both validation and the profile extractor
+        prompt = f"""Extract patient information from this text:
 
 Text: "{user_input.symptoms}"
 
-Return JSON with these keys (use null if not found):
-{{
-    "age": "number or null",
-    "height": "format like 6'1\" or 185cm or null", 
-    "weight": "number or null",
-    "weight_unit": "lbs or kg or null"
-}}
-
-Extract only what is explicitly stated. Be precise."""
+Extract only what is explicitly stated. Do not infer or assume. Leave fields empty if not found."""
 
         messages = [
-            SystemMessage(content="You are a data extractor. Return only valid JSON. No other text."),
+            SystemMessage(content="You are a medical information extractor."),
             HumanMessage(content=prompt)
         ]
         
         try:
-            response = self.llm.invoke(messages)
-            extracted_data = json.loads(response.content.strip())
+            extracted = self.extractor.invoke(messages)
             
             # Convert and validate
-            age = extracted_data.get("age")
-            height_str = extracted_data.get("height")
-            weight = extracted_data.get("weight")
-            weight_unit = extracted_data.get("weight_unit", "kg")
-            
-            height_cm = self.validator.convert_height_to_cm(height_str) if height_str else None
-            weight_kg = self.validator.convert_weight_to_kg(weight, weight_unit) if weight else None
+            height_cm = self.validator.convert_height_to_cm(extracted.height) if extracted.height else None
+            weight_kg = self.validator.convert_weight_to_kg(extracted.weight, extracted.weight_unit or "kg") if extracted.weight else None
             
-            validation_result = self.validator.validate_demographics(age, height_cm, weight_kg)
+            validation_result = self.validator.validate_demographics(extracted.age, height_cm, weight_kg)
             
             if not validation_result["valid"]:
                 return {
@@ -308,13 +309,14 @@ Extract only what is explicitly stated. Be precise."""
             emergency_check = self.validator.validate_emergency_consistency(user_input.symptoms)
             
             return {
+                "extracted_profile": extracted,
                 "validation_error": False,
                 "validation_warnings": validation_result.get("warnings", []),
                 "emergency_override": emergency_check.get("emergency_override", False),
                 "emergency_message": emergency_check.get("message", "")
             }
             
-        except (json.JSONDecodeError, Exception) as e:
+        except Exception as e:
             # If extraction fails, continue without validation (but log warning)
             print(f"Validation extraction failed: {e}")
             return {"validation_error": False, "validation_warnings": ["Could not validate demographics"]}
@@ -443,57 +445,21 @@ Your AI Health Team
     #=========================================================================
     
     def _profile_extractor(self, state: MultiAgentHealthState):
-        """Extract user profile using structured LLM output with validation awareness"""
+        """Update the patient profile from the data validator's extraction"""
         user_input = state["user_input"]
         
         # Check for validation warnings
         validation_warnings = state.get("validation_warnings", [])
+        extracted = state.get("extracted_profile")
         
-        prompt = f"""Extract user information from this text and return ONLY a JSON object with these exact keys:
-
-Text: "{user_input.symptoms}"
-
-Return JSON with these keys (use null if not found):
-{{
-    "name": "string or null",
-    "age": "number or null",
-    "gender": "male or female or null",
-    "height": "format like 6'1\" or 185cm or null",
-    "weight": "number or null",
-    "weight_unit": "lbs or kg or null",
-    "conditions": ["condition1", "condition2"] or [],
-    "medications": ["med1", "med2"] or [],
-    "allergies": ["allergy1", "allergy2"] or [],
-    "family_history": ["condition1", "condition2"] or [],
-    "lab_values": {{"test_name": number}} or {{}},
-    "lifestyle": {{
-        "smoking": "yes or no or former or null",
-        "alcohol": "frequency description or null",
-        "exercise": "frequency description or null"
-    }}
-}}
-
-Extract only what is explicitly stated. Do not infer or assume."""
-
-        messages = [
-            SystemMessage(content="You are a medical information extractor. Return only valid JSON. No other text."),
-            HumanMessage(content=prompt)
-        ]
-        
-        try:
-            response = self.llm.invoke(messages)
-            extracted_data = json.loads(response.content.strip())
-            
-            # Update patient context with extracted data (same logic as before)
-            self._update_patient_context_from_data(extracted_data)
+        if extracted is not None:
+            self._update_patient_context_from_data(extracted.model_dump())
             
             # Add validation warnings to patient context if any
             if validation_warnings:
                 self.patient_context.lifestyle_factors["validation_warnings"] = validation_warnings
-            
-        except (json.JSONDecodeError, Exception) as e:
-            print(f"Profile extraction error: {e}")
-            # Fallback extraction logic (same as before)
+        else:
+            # Extraction failed in the validator
             self._fallback_extraction(user_input)
         
         # Update symptoms timeline
@@ -609,16 +575,7 @@ Extract only what is explicitly stated. Do not infer or assume."""
             }
         
         # Enhanced emergency keyword detection
-        emergency_keywords = [
-            "chest pain", "vomiting blood", "black tarry stools", 
-            "difficulty breathing", "shortness of breath", "can't breathe",
-            "confusion", "fever 103", "fever over", "unconscious", 
-            "seizure", "stroke", "heart attack", "severe bleeding",
-            "severe pain", "radiating pain", "left arm pain"
-        ]
-        
-        symptoms_text = user_input.symptoms.lower()
-        emergency_flags = [keyword for keyword in emergency_keywords if keyword in symptoms_text]
+        emergency_flags = self._emergency_prescreen(user_input.symptoms)
         
         # If emergency symptoms detected, always route to emergency
         if emergency_flags:
@@ -632,89 +589,67 @@ Extract only what is explicitly stated. Do not infer or assume."""
                 )
             }
         
-        # Check if this is actually a health query
-        intent_prompt = f"""Classify this query as health-related or not:
-
-Query: "{user_input.symptoms}"
-
-Health-related queries include:
-- Physical symptoms (pain, fever, headache, etc.)
-- Medical conditions or diseases
-- Medications and treatments
-- Diet and nutrition questions
-- Mental health concerns
-- Exercise and fitness questions
-- Medical test results
-- Doctor visits or medical procedures
-- Health prevention and wellness
-
-Respond with only: HEALTH or NON_HEALTH"""
-        
-        intent_messages = [
-            SystemMessage(content="You are an intent classifier. Respond with only HEALTH or NON_HEALTH."),
-            HumanMessage(content=intent_prompt)
-        ]
+        # Local hints: intent classifier and symptoms from the lexicon
+        intent, intent_confidence, intent_source = classify_intent(user_input.symptoms)
+        symptom_matches = find_medical_terms(user_input.symptoms)
         
-        intent_response = self.llm.invoke(intent_messages)
-        intent = intent_response.content.strip().upper()
+        # A confident local NON_HEALTH needs no LLM call at all
+        if intent == "NON_HEALTH":
+            return {"triage_result": self._non_health_triage(intent_confidence)}
         
-        # If not health-related, return rejection routing
-        if "NON_HEALTH" in intent:
-            triage_result = TriageResult(
-                intent_classification="non_health",
-                urgency_level="N/A",
-                emergency_flags=[],
-                routing_decision="non_health_rejection",
-                confidence_score=0.9
-            )
-            return {"triage_result": triage_result}
+        intent_hint = f"{intent} ({intent_confidence:.2f})" if intent else f"unsure ({intent_confidence:.2f})"
+        symptom_hint = ', '.join(f"{match['term']} ({match['category']})" for match in symptom_matches) or 'none'
         
-        # Normal health triage logic
-        prompt = f"""Classify this health query:
+        # Intent, urgency and route in one schema-bound call
+        prompt = f"""Triage this query:
         Query: {user_input.symptoms}
         Patient: {patient_context.age or 'Unknown'} year old {patient_context.gender or 'Unknown'}
         
-        Return:
-        1. Urgency: LOW/MEDIUM/HIGH
-        2. Route: diet_only/treatment_only/diagnosis_only/full_pipeline/clarification
-        """
+        Hints from local checks:
+        - Intent classifier: {intent_hint}
+        - Symptoms matched: {symptom_hint}
+        
+        Health-related queries include symptoms, conditions, medications, diet and nutrition,
+        mental health, exercise and fitness, test results, doctor visits and prevention.
+        
+        Routes: diet_only, treatment_only, diagnosis_only, full_pipeline (needs all three), clarification (too vague to answer)."""
         
         messages = [
             SystemMessage(content="You are a medical triage assistant."),
             HumanMessage(content=prompt)
         ]
         
-        response = self.llm.invoke(messages)
-        content = response.content.lower()
-        
-        # Parse response
-        urgency = "MEDIUM"
-        if "high" in content:
-            urgency = "HIGH"
-        elif "low" in content:
-            urgency = "LOW"
-        
-        # Determine routing
-        routing = "full_pipeline"
-        if "diet_only" in content:
-            routing = "diet_only"
-        elif "treatment_only" in content:
-            routing = "treatment_only"
-        elif "diagnosis_only" in content:
-            routing = "diagnosis_only"
-        elif "clarification" in content:
-            routing = "clarification"
+        try:
+            decision = self.triage_llm.invoke(messages)
+        except Exception as e:
+            print(f"Triage error: {e}")
+            decision = TriageDecision(intent="HEALTH", urgency="MEDIUM", route="full_pipeline")
+        
+        # A symptom match or a confident model HEALTH stands; a phrase match alone
+        # is only a hint the LLM may overrule
+        locally_health = intent == "HEALTH" and intent_source in ("lexicon", "model")
+        if decision.intent == "NON_HEALTH" and not locally_health:
+            return {"triage_result": self._non_health_triage(0.9)}
         
         triage_result = TriageResult(
             intent_classification="health",
-            urgency_level=urgency,
+            urgency_level=decision.urgency,
             emergency_flags=[],
-            routing_decision=routing,
+            routing_decision=decision.route,
             confidence_score=0.8
         )
         
         return {"triage_result": triage_result}
     
+    def _non_health_triage(self, confidence: float) -> TriageResult:
+        return TriageResult(
+            intent_classification="non_health",
+            urgency_level="N/A",
+            emergency_flags=[],
+            routing_decision="non_health_rejection",
+            confidence_score=confidence
+        )
+    
     #=========================================================================
     # OTHER AGENTS (keep existing logic but add emergency awareness)
     #=========================================================================
@@ -776,10 +711,8 @@ Keep the response professional, helpful, and under 3 sentences."""
         user_input = state["user_input"]
         patient_context = state.get("patient_context", self.patient_context)
         
-        # Research symptoms
-        wikipedia_results = search_wikipedia.invoke({"query": user_input.symptoms})
-        tavily_results = search_tavily.invoke({"query": user_input.symptoms})
-        research_content = combine_search_results(wikipedia_results, tavily_results)
+        # Research symptoms (usually already fetched during validation and triage)
+        research_content = self._take_research(user_input.symptoms)
         
         # Score severity
         severity_score = score_symptom_severity.invoke({
@@ -841,16 +774,20 @@ Keep the response professional, helpful, and under 3 sentences."""
             HumanMessage(content=prompt)
         ]
         
-        response = self.llm.invoke(messages)
+        try:
+            advice = self.diet_llm.invoke(messages)
+        except Exception as e:
+            print(f"Diet advice error: {e}")
+            advice = DietAdvice()
         
         diet_result = DietResult(
             diagnosed_condition=', '.join(patient_context.conditions) if patient_context.conditions else user_input.symptoms,
-            dietary_restrictions=[],
+            dietary_restrictions=advice.dietary_restrictions,
             nutritional_needs=nutrition_calc,
-            recommended_foods=[],
-            foods_to_avoid=[],
-            meal_suggestions=[],
-            supplements=[]
+            recommended_foods=advice.recommended_foods,
+            foods_to_avoid=advice.foods_to_avoid,
+            meal_suggestions=advice.meal_suggestions,
+            supplements=advice.supplements
         )
         
         return {"diet_result": diet_result}
@@ -858,11 +795,16 @@ Keep the response professional, helpful, and under 3 sentences."""
     def _treatment_agent(self, state: MultiAgentHealthState):
         user_input = state["user_input"]
         patient_context = state.get("patient_context", self.patient_context)
-        diagnosis_result = state.get("diagnosis_result")
+        
+        # Score severity here rather than waiting for the diagnosis agent, so both can run at once
+        severity_score = score_symptom_severity.invoke({
+            "symptoms": [user_input.symptoms], 
+            "age": patient_context.age or 30
+        })
         
         # Schedule appointment if needed
         appointment = schedule_appointment.invoke({
-            "urgency": diagnosis_result.severity_level.lower() if diagnosis_result else "moderate",
+            "urgency": severity_score.get("severity_level", "MODERATE").lower(),
             "condition": ', '.join(patient_context.conditions) if patient_context.conditions else user_input.symptoms,
             "preferred_timeframe": "soon"
         })
@@ -881,20 +823,43 @@ Keep the response professional, helpful, and under 3 sentences."""
             HumanMessage(content=prompt)
         ]
         
-        response = self.llm.invoke(messages)
+        try:
+            advice = self.treatment_llm.invoke(messages)
+        except Exception as e:
+            print(f"Treatment advice error: {e}")
+            advice = TreatmentAdvice()
         
         treatment_result = TreatmentResult(
             diagnosis={},
             treatment_options=[],
-            care_recommendations=[],
-            lifestyle_changes=[],
+            care_recommendations=advice.care_recommendations,
+            lifestyle_changes=advice.lifestyle_changes,
             follow_up_schedule=appointment,
-            when_to_see_doctor=appointment.get("recommended_timeframe", "As needed"),
+            when_to_see_doctor=advice.when_to_see_doctor or appointment.get("recommended_timeframe", "As needed"),
             appointment_needed=True
         )
         
         return {"treatment_result": treatment_result}
     
+    def _run_specialists_parallel(self, state: MultiAgentHealthState, progress_callback=None):
+        """Run diagnosis, diet and treatment agents concurrently and merge their results"""
+        agents = {
+            "🔍 Symptom analysis done": self._diagnosis_agent,
+            "🥗 Dietary recommendations done": self._diet_agent,
+            "💊 Treatment plan done": self._treatment_agent
+        }
+        updates = {}
+        
+        with ThreadPoolExecutor(max_workers=len(agents)) as executor:
+            futures = {executor.submit(agent, state): message for message, agent in agents.items()}
+            # Progress is reported from this thread, as Streamlit calls must be
+            for finished, future in enumerate(as_completed(futures), start=1):
+                updates.update(future.result())
+                if progress_callback:
+                    progress_callback(f"{futures[future]}...", 0.3 + 0.5 * finished / len(agents))
+        
+        return updates
+    
     def _synthesis_agent(self, state: MultiAgentHealthState):
         user_input = state["user_input"]
         patient_context = state.get("patient_context", self.patient_context)
@@ -906,9 +871,22 @@ Keep the response professional, helpful, and under 3 sentences."""
         if state.get("diagnosis_result"):
             all_outputs["diagnosis"] = state["diagnosis_result"].symptom_analysis
         if state.get("diet_result"):
-            all_outputs["diet"] = "Nutritional recommendations provided"
+            diet_result = state["diet_result"]
+            all_outputs["diet"] = {
+                "recommended_foods": diet_result.recommended_foods,
+                "foods_to_avoid": diet_result.foods_to_avoid,
+                "meal_suggestions": diet_result.meal_suggestions,
+                "dietary_restrictions": diet_result.dietary_restrictions,
+                "supplements": diet_result.supplements
+            }
         if state.get("treatment_result"):
-            all_outputs["treatment"] = "Care guidance provided"
+            treatment_result = state["treatment_result"]
+            all_outputs["treatment"] = {
+                "care_recommendations": treatment_result.care_recommendations,
+                "lifestyle_changes": treatment_result.lifestyle_changes,
+                "when_to_see_doctor": treatment_result.when_to_see_doctor,
+                "appointment": treatment_result.follow_up_schedule
+            }
         
         # Safety validation
         safety_check = validate_medical_safety.invoke({
@@ -996,12 +974,72 @@ Keep the response professional, helpful, and under 3 sentences."""
         
         return {"hallucination_check": hallucination_check}
     
+    #=========================================================================
+    # EMERGENCY PRE-SCREEN
+    #=========================================================================
+    
+    def _emergency_prescreen(self, text: str) -> list:
+        """Emergency symptoms found in the text (medical_lexicon) - no LLM involved"""
+        return emergency_terms(text)
+    
+    def _update_profile_in_background(self, state: MultiAgentHealthState):
+        """Extract and validate the profile after an emergency response has been sent"""
+        def update():
+            try:
+                validation = self._data_validator(state)
+                if validation.get("validation_error"):
+                    return
+                state.update(validation)
+                self._profile_extractor(state)
+            except Exception as e:
+                print(f"Background profile extraction failed: {e}")
+        
+        self.pending_profile_update = threading.Thread(target=update, daemon=True)
+        self.pending_profile_update.start()
+    
+    def _wait_for_profile_update(self):
+        """Make sure the previous message's profile update has landed"""
+        if self.pending_profile_update is not None:
+            self.pending_profile_update.join()
+            self.pending_profile_update = None
+    
+    #=========================================================================
+    # SPECULATIVE RESEARCH
+    #=========================================================================
+    
+    def _research(self, query: str) -> str:
+        """Wikipedia and Tavily research for the symptom text, run concurrently"""
+        results = run_research(query)
+        return combine_search_results(results.get("wikipedia", ""), results.get("tavily", ""))
+    
+    def _prefetch_research(self, query: str):
+        """Start research now so it overlaps the LLM calls before diagnosis"""
+        self._drop_research_prefetch()
+        self.research_prefetch = (query, self.research_executor.submit(self._research, query))
+    
+    def _drop_research_prefetch(self):
+        if self.research_prefetch is not None:
+            # A search already running can't be stopped; its result is just ignored
+            self.research_prefetch[1].cancel()
+            self.research_prefetch = None
+    
+    def _take_research(self, query: str) -> str:
+        """Research for the query, from the prefetch when there is one"""
+        prefetch = self.research_prefetch
+        if prefetch is not None and prefetch[0] == query and not prefetch[1].cancelled():
+            try:
+                return prefetch[1].result()
+            except Exception as e:
+                print(f"Research prefetch failed, searching again: {e}")
+        return self._research(query)
+    
     #=========================================================================
     # MAIN PROCESSING WITH ENHANCED VALIDATION
     #=========================================================================
     
     def process_health_query(self, user_input: UserInput, personality: str = "concise", thread_id: str = "default", progress_callback=None):
         thread = {"configurable": {"thread_id": thread_id}}
+        self._wait_for_profile_update()
         
         # Add to conversation history
         self.conversation_history.append(f"User: {user_input.symptoms}")
@@ -1009,8 +1047,34 @@ Keep the response professional, helpful, and under 3 sentences."""
         # Update timestamp
         self.patient_context.last_updated = datetime.now()
         
-        # Process with enhanced validation
-        if progress_callback:
+        # Emergencies are answered before any LLM call; the profile is updated in the background
+        emergency_flags = self._emergency_prescreen(user_input.symptoms)
+        # Searches can't be cancelled once started, so skip them when triage will
+        # reject the message locally as NON_HEALTH
+        if not emergency_flags and classify_intent(user_input.symptoms)[0] != "NON_HEALTH":
+            self._prefetch_research(user_input.symptoms)
+        
+        if emergency_flags:
+            if progress_callback:
+                progress_callback("🚨 Emergency detected - priority handling...", 0.5)
+            state = {
+                "user_input": user_input,
+                "personality": personality,
+                "conversation_history": self.conversation_history.copy(),
+                "openai_settings": self.openai_settings,
+                "patient_context": self.patient_context,
+                "triage_result": TriageResult(
+                    intent_classification="emergency",
+                    urgency_level="EMERGENCY",
+                    emergency_flags=emergency_flags,
+                    routing_decision="emergency",
+                    confidence_score=0.95
+                )
+            }
+            state.update(self._emergency_handler(state))
+            self._update_profile_in_background(dict(state))
+            result = state
+        elif progress_callback:
             # Step by step processing with progress updates
             state = {
                 "user_input": user_input,
@@ -1021,7 +1085,7 @@ Keep the response professional, helpful, and under 3 sentences."""
             }
             
             # Data validation
-            progress_callback("🔍 Validating input data...", 0.05)
+            progress_callback("🔍 Extracting and validating patient data...", 0.05)
             state.update(self._data_validator(state))
             
             # Handle validation errors
@@ -1031,7 +1095,7 @@ Keep the response professional, helpful, and under 3 sentences."""
                 result = state
             else:
                 # Profile extraction
-                progress_callback("👤 Extracting user profile...", 0.1)
+                progress_callback("👤 Updating user profile...", 0.1)
                 state.update(self._profile_extractor(state))
                 
                 # Update patient context
@@ -1043,6 +1107,7 @@ Keep the response professional, helpful, and under 3 sentences."""
                 state.update(self._triage_agent(state))
                 
                 routing = state["triage_result"].routing_decision
+                self._route_nodes(routing)
                 
                 # Handle different routing decisions
                 if routing == "emergency":
@@ -1081,12 +1146,8 @@ Keep the response professional, helpful, and under 3 sentences."""
                         progress_callback("✅ Validating recommendations...", 0.95)
                         state.update(self._hallucination_detector(state))
                     else:  # full_pipeline
-                        progress_callback("🔍 Analyzing symptoms...", 0.3)
-                        state.update(self._diagnosis_agent(state))
-                        progress_callback("🥗 Generating dietary recommendations...", 0.5)
-                        state.update(self._diet_agent(state))
-                        progress_callback("💊 Creating treatment plan...", 0.7)
-                        state.update(self._treatment_agent(state))
+                        progress_callback("🔍 Analyzing symptoms, diet and treatment...", 0.3)
+                        state.update(self._run_specialists_parallel(state, progress_callback))
                         progress_callback("🧠 Synthesizing response...", 0.85)
                         state.update(self._synthesis_agent(state))
                         progress_callback("✅ Validating recommendations...", 0.95)
@@ -1107,6 +1168,9 @@ Keep the response professional, helpful, and under 3 sentences."""
             if result.get("patient_context"):
                 self.patient_context = result["patient_context"]
         
+        # Research is only good for this message
+        self._drop_research_prefetch()
+        
         # Generate final response
         synthesis_result = result["synthesis_result"]
         final_plan = synthesis_result.final_recommendations.get("plan", "")
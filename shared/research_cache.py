@@ -0,0 +1,146 @@
+# Shared by the Sprint 3 and Sprint 4 health apps, which both put this directory on sys.path
+import os
+import re
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+# One cache file for every session and both health apps; set RESEARCH_CACHE_PATH="" to turn caching off
+RESEARCH_CACHE_PATH = os.getenv(
+    "RESEARCH_CACHE_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "healthbot", "research_cache.sqlite3")
+)
+RESEARCH_CACHE_TTL_HOURS = float(os.getenv("RESEARCH_CACHE_TTL_HOURS", "72"))
+RESEARCH_CACHE_MAX_ENTRIES = int(os.getenv("RESEARCH_CACHE_MAX_ENTRIES", "2000"))
+
+
+def normalize_query(query: str) -> str:
+    """'Headache & Fatigue?' and 'headache fatigue' share a cache entry"""
+    return " ".join(re.findall(r"[a-z0-9]+", query.lower()))
+
+
+class ResearchCache:
+    """
+    SQLite cache of search results keyed by (source, normalized query).
+    
+    Entries expire after `ttl_hours`; beyond `max_entries` the least recently
+    used ones are evicted. Each call opens its own connection, so the cache
+    can be used from several threads and processes at once.
+    """
+    
+    def __init__(self, path: str = RESEARCH_CACHE_PATH, ttl_hours: float = RESEARCH_CACHE_TTL_HOURS,
+                 max_entries: int = RESEARCH_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_hours * 3600
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        self.enabled = bool(path)
+        
+        if self.enabled:
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                with self._connect() as conn:
+                    # WAL lets the two apps read while one of them writes
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute("""
+                        CREATE TABLE IF NOT EXISTS research (
+                            source TEXT NOT NULL,
+                            query TEXT NOT NULL,
+                            result TEXT NOT NULL,
+                            created_at REAL NOT NULL,
+                            last_used REAL NOT NULL,
+                            PRIMARY KEY (source, query)
+                        )
+                    """)
+                    conn.execute("CREATE INDEX IF NOT EXISTS research_last_used ON research (last_used)")
+            except sqlite3.Error as e:
+                print(f"Warning: research cache disabled: {e}")
+                self.enabled = False
+    
+    @contextmanager
+    def _connect(self):
+        """A short-lived connection that commits on success and is always closed"""
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+    
+    def _count(self, name: str, amount: int = 1):
+        with self.lock:
+            self.stats[name] += amount
+    
+    def get(self, source: str, query: str) -> Optional[str]:
+        """Cached result, or None if missing or expired"""
+        if not self.enabled:
+            return None
+        key = normalize_query(query)
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT result FROM research WHERE source = ? AND query = ? AND created_at > ?",
+                    (source, key, now - self.ttl_seconds)
+                ).fetchone()
+                if row:
+                    conn.execute("UPDATE research SET last_used = ? WHERE source = ? AND query = ?", (now, source, key))
+        except sqlite3.Error as e:
+            print(f"Warning: research cache read failed: {e}")
+            row = None
+        
+        self._count("hits" if row else "misses")
+        return row[0] if row else None
+    
+    def set(self, source: str, query: str, result: str):
+        """Store a result, then drop expired and least recently used entries"""
+        if not self.enabled:
+            return
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO research (source, query, result, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                    (source, normalize_query(query), result, now, now)
+                )
+                expired = conn.execute("DELETE FROM research WHERE created_at <= ?", (now - self.ttl_seconds,)).rowcount
+                overflow = conn.execute("""
+                    DELETE FROM research WHERE rowid IN (
+                        SELECT rowid FROM research ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                    )
+                """, (self.max_entries,)).rowcount
+            self._count("writes")
+            self._count("evictions", expired + overflow)
+        except sqlite3.Error as e:
+            print(f"Warning: research cache write failed: {e}")
+    
+    def clear(self):
+        if not self.enabled:
+            return
+        try:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM research")
+        except sqlite3.Error as e:
+            print(f"Warning: research cache clear failed: {e}")
+    
+    def get_stats(self) -> dict:
+        """Hits and misses in this process, plus the entries on disk"""
+        with self.lock:
+            stats = dict(self.stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        stats["entries"] = 0
+        if self.enabled:
+            try:
+                with self._connect() as conn:
+                    stats["entries"] = conn.execute("SELECT COUNT(*) FROM research").fetchone()[0]
+            except sqlite3.Error:
+                pass
+        return stats
+
+
+# Shared by every session in this process
+research_cache = ResearchCache()